@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CreditAppConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "credit_app"
+
+    def ready(self):
+        from .querycount import connect_task_signals, get_config
+
+        if get_config()['ENABLED']:
+            connect_task_signals()
@@ -0,0 +1,136 @@
+import itertools
+import random
+import time
+import tracemalloc
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connections
+from django.test import Client
+
+from ..querycount import record_queries
+from .results import summarize
+from .synthetic import LAST_NAMES
+
+# `build(rng)` returns the (path, json payload) for a single request.
+Scenario = namedtuple('Scenario', ['name', 'method', 'build', 'read_only'])
+
+
+def default_scenarios(customer_ids, loan_ids):
+    """One scenario per public endpoint, sampling ids from the loaded data."""
+    # Generated customers use 91xxxxxxxx-99xxxxxxxx, so these never collide.
+    phone_numbers = itertools.count(8000000000)
+
+    def loan_request(rng):
+        return {
+            'customer_id': rng.choice(customer_ids),
+            'loan_amount': rng.randint(1, 5) * 100000,
+            'interest_rate': round(rng.uniform(8.0, 18.0), 2),
+            'tenure': rng.choice([6, 12, 24, 36, 60]),
+        }
+
+    def register(rng):
+        return '/register', {
+            'first_name': 'Bench',
+            'last_name': 'Customer',
+            'age': rng.randint(20, 70),
+            'monthly_income': rng.randrange(32, 300) * 1000,
+            'phone_number': str(next(phone_numbers)),
+        }
+
+    def search(rng):
+        if rng.random() < 0.5:
+            return f'/search-customers?q=9{rng.randint(10, 99)}', None
+        return f'/search-customers?q={rng.choice(LAST_NAMES)[:4]}', None
+
+    return [
+        Scenario('register', 'post', register, False),
+        Scenario('check_eligibility', 'post', lambda rng: ('/check-eligibility', loan_request(rng)), True),
+        Scenario('create_loan', 'post', lambda rng: ('/create-loan', loan_request(rng)), False),
+        Scenario('view_loan', 'get', lambda rng: (f'/view-loan/{rng.choice(loan_ids)}', None), True),
+        Scenario('view_loans', 'get', lambda rng: (f'/view-loans/{rng.choice(customer_ids)}', None), True),
+        Scenario('search_customers', 'get', search, True),
+    ]
+
+
+def send(client, scenario, rng):
+    path, payload = scenario.build(rng)
+    if scenario.method == 'get':
+        return client.get(path)
+    return client.post(path, data=payload, content_type='application/json')
+
+
+def measure_endpoint(scenario, iterations, alloc_iterations, seed=0, warmup=3):
+    """Latency and query count per request, then a separate tracemalloc pass."""
+    rng = random.Random(seed)
+    # Server errors are counted (and gated) rather than raised.
+    client = Client(raise_request_exception=False)
+    for _ in range(warmup):
+        send(client, scenario, rng)
+
+    latencies, query_counts, errors = [], [], 0
+    for _ in range(iterations):
+        # Counts queries on every alias, including replicas.
+        with record_queries() as queries:
+            started = time.perf_counter()
+            response = send(client, scenario, rng)
+            latencies.append((time.perf_counter() - started) * 1000)
+        query_counts.append(queries.count)
+        if response.status_code >= 500:
+            errors += 1
+
+    # tracemalloc slows every allocation down, so it never overlaps the
+    # latency samples above.
+    allocations = []
+    tracemalloc.start()
+    try:
+        for _ in range(alloc_iterations):
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            send(client, scenario, rng)
+            _, peak = tracemalloc.get_traced_memory()
+            allocations.append((peak - before) / 1024)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'latency_ms': summarize(latencies),
+        'queries': summarize(query_counts),
+        'alloc_kib': summarize(allocations),
+        'errors': errors,
+    }
+
+
+def run_load(scenarios, concurrency, requests_per_worker, seed=0):
+    """Drives the read-only scenarios from `concurrency` threads at once."""
+    scenarios = [scenario for scenario in scenarios if scenario.read_only]
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        client = Client(raise_request_exception=False)
+        latencies, errors = [], 0
+        try:
+            for request_number in range(requests_per_worker):
+                scenario = scenarios[(index + request_number) % len(scenarios)]
+                started = time.perf_counter()
+                response = send(client, scenario, rng)
+                latencies.append((time.perf_counter() - started) * 1000)
+                if response.status_code >= 500:
+                    errors += 1
+        finally:
+            connections.close_all()
+        return latencies, errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for worker_latencies, _ in outcomes for latency in worker_latencies]
+    return {
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': sum(errors for _, errors in outcomes),
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'latency_ms': summarize(latencies),
+    }
@@ -0,0 +1,99 @@
+import os
+import random
+import time
+from decimal import Decimal
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from ..models import Customer, IngestManifest, Loan
+from ..tasks import ingest_customer_data_task, ingest_loan_data_task
+from ..views import calculate_credit_score, calculate_credit_scores, calculate_emi
+from .results import summarize
+from .synthetic import CUSTOMER_COLUMNS, LOAN_COLUMNS, write_xlsx
+
+
+def time_calls(fn, iterations, warmup=10):
+    """Per-call wall time in microseconds."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000000)
+    return summarize(samples)
+
+
+def bench_calculate_emi(iterations):
+    principal = Decimal('500000.00')
+    interest_rate = Decimal('12.50')
+    return {'time_us': time_calls(lambda: calculate_emi(principal, interest_rate, 120), iterations)}
+
+
+def bench_calculate_credit_score(customer_ids, iterations, seed=0):
+    rng = random.Random(seed)
+    query_counts = []
+
+    def score():
+        with CaptureQueriesContext(connection) as queries:
+            calculate_credit_score(rng.choice(customer_ids))
+        query_counts.append(len(queries))
+
+    timings = time_calls(score, iterations, warmup=3)
+    return {'time_us': timings, 'queries': summarize(query_counts)}
+
+
+def bench_batch_scoring(customer_ids, workdir, iterations):
+    """Builds and maps a loan book, then scores every customer from it."""
+    from ..loanbook import LoanBook
+
+    path = os.path.join(workdir, 'loan_book.bin')
+    started = time.perf_counter()
+    LoanBook.build().save(path)
+    build_ms = (time.perf_counter() - started) * 1000
+    loan_book = LoanBook.load(path)
+
+    timings = time_calls(lambda: calculate_credit_scores(customer_ids, loan_book), iterations, warmup=1)
+    return {
+        'time_us': timings,
+        'build_ms': round(build_ms, 2),
+        'bytes_per_customer': round(os.path.getsize(path) / max(len(customer_ids), 1), 1),
+    }
+
+
+def bench_ingest(customers, loans, workdir, iterations=1):
+    """Times both ingest tasks end to end, including reading the workbooks.
+
+    Every iteration starts from empty tables and is followed by a re-run
+    over the same files, which should find nothing to write. The last
+    iteration leaves the ingested data in place.
+    """
+    customer_file = os.path.join(workdir, 'customer_data.xlsx')
+    loan_file = os.path.join(workdir, 'loan_data.xlsx')
+    write_xlsx(customers, CUSTOMER_COLUMNS, customer_file)
+    write_xlsx(loans, LOAN_COLUMNS, loan_file)
+
+    tasks = [
+        ('ingest_customer_data_task', ingest_customer_data_task, customer_file),
+        ('ingest_loan_data_task', ingest_loan_data_task, loan_file),
+    ]
+    runs = tasks + [(f'{name}_rerun', task, path) for name, task, path in tasks]
+    samples = {name: [] for name, _, _ in runs}
+    query_counts = {name: [] for name, _, _ in runs}
+
+    for _ in range(iterations):
+        IngestManifest.objects.all().delete()
+        Loan.objects.all().delete()
+        Customer.objects.all().delete()
+        for name, task, path in runs:
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                task(path)
+                samples[name].append((time.perf_counter() - started) * 1000000)
+            query_counts[name].append(len(queries))
+
+    return {
+        name: {'time_us': summarize(samples[name]), 'queries': summarize(query_counts[name])}
+        for name, _, _ in runs
+    }
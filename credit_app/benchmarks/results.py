@@ -0,0 +1,109 @@
+import json
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+import django
+from django.db import connection
+
+# (metric suffix, tolerance option, direction). Query and error counts are
+# gated exactly; timings and allocations get a relative tolerance because
+# they are noisy between runs. Metrics missing from either run are skipped.
+REGRESSION_GATES = [
+    ('latency_ms.p50', 'max_slowdown', 'higher'),
+    ('latency_ms.p95', 'max_slowdown', 'higher'),
+    ('time_us.p50', 'max_slowdown', 'higher'),
+    ('alloc_kib.mean', 'max_alloc_growth', 'higher'),
+    ('startup_ms.p50', 'max_slowdown', 'higher'),
+    ('rss_kib.p50', 'max_alloc_growth', 'higher'),
+    ('queries.max', None, 'higher'),
+    ('errors', None, 'higher'),
+    ('throughput_rps', 'max_slowdown', 'lower'),
+]
+
+
+def percentile(sorted_samples, fraction):
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, int(round(fraction * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+
+def summarize(samples):
+    """Reduces raw samples to the statistics stored in the results file."""
+    ordered = sorted(samples)
+    return {
+        'count': len(ordered),
+        'mean': round(sum(ordered) / len(ordered), 4) if ordered else 0.0,
+        'min': round(ordered[0], 4) if ordered else 0.0,
+        'p50': round(percentile(ordered, 0.50), 4),
+        'p95': round(percentile(ordered, 0.95), 4),
+        'p99': round(percentile(ordered, 0.99), 4),
+        'max': round(ordered[-1], 4) if ordered else 0.0,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment_metadata(**extra):
+    metadata = {
+        'commit': _git_commit(),
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'machine': platform.machine(),
+    }
+    metadata.update(extra)
+    return metadata
+
+
+def write_results(report, path):
+    with open(path, 'w') as fh:
+        json.dump(report, fh, indent=2, sort_keys=True, default=str)
+
+
+def load_results(path):
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def flatten(report, prefix=''):
+    flat = {}
+    for key, value in report.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare_results(baseline, current, max_slowdown=0.25, max_alloc_growth=0.25):
+    """Returns a list of human readable regressions of `current` vs `baseline`."""
+    tolerances = {'max_slowdown': max_slowdown, 'max_alloc_growth': max_alloc_growth}
+    old = flatten(baseline.get('results', {}))
+    new = flatten(current.get('results', {}))
+    regressions = []
+    for name in sorted(old.keys() & new.keys()):
+        for suffix, tolerance_name, direction in REGRESSION_GATES:
+            if not name.endswith(suffix):
+                continue
+            before, after = old[name], new[name]
+            tolerance = tolerances[tolerance_name] if tolerance_name else 0
+            if direction == 'higher':
+                limit = before * (1 + tolerance)
+                failed = after > limit
+            else:
+                limit = before * (1 - tolerance)
+                failed = after < limit
+            if failed:
+                regressions.append(f"{name}: {before} -> {after} (limit {round(limit, 4)})")
+    return regressions
@@ -0,0 +1,83 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+
+from .results import summarize
+
+HEAVY_MODULES = ['pandas', 'numpy', 'openpyxl']
+
+# Each profile runs in a fresh interpreter. `ingest` is the reference point:
+# what every process paid when views.py and tasks.py imported pandas eagerly.
+PROFILES = {
+    'web': (
+        'from credit_approval_system.wsgi import application\n'
+        'import credit_approval_system.urls\n'
+    ),
+    'worker': (
+        'from credit_approval_system.celery import app\n'
+        'app.loader.import_default_modules()\n'
+    ),
+    'ingest': (
+        'from credit_approval_system.celery import app\n'
+        'app.loader.import_default_modules()\n'
+        'import pandas, openpyxl\n'
+    ),
+}
+
+# Peak RSS comes from VmHWM in /proc/self/status, which starts over at exec.
+# getrusage()'s ru_maxrss doesn't: on Linux the child inherits the
+# benchmark process's own peak, so every profile would report the same
+# number. Without /proc (e.g. macOS) no RSS is reported.
+_CHILD = '''
+import json, sys, time
+started = time.perf_counter()
+{body}
+def peak_rss_kib():
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+print(json.dumps({{
+    "import_ms": (time.perf_counter() - started) * 1000,
+    "rss_kib": peak_rss_kib(),
+    "loaded": [name for name in {heavy!r} if name in sys.modules],
+}}))
+'''
+
+
+def run_profile(body, iterations):
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'credit_approval_system.settings')}
+    script = _CHILD.format(body=body, heavy=HEAVY_MODULES)
+    startup, imports, rss, loaded = [], [], [], []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, '-c', script], cwd=settings.BASE_DIR, env=env,
+            check=True, capture_output=True, text=True,
+        ).stdout
+        startup.append((time.perf_counter() - started) * 1000)
+        child = json.loads(output.strip().splitlines()[-1])
+        imports.append(child['import_ms'])
+        if child['rss_kib'] is not None:
+            rss.append(child['rss_kib'])
+        loaded = child['loaded']
+    result = {
+        'startup_ms': summarize(startup),
+        'import_ms': summarize(imports),
+        'heavy_modules': loaded,
+    }
+    if rss:
+        result['rss_kib'] = summarize(rss)
+    return result
+
+
+def bench_startup(iterations=5):
+    """Cold-start wall time, import time and peak RSS per process type."""
+    return {name: run_profile(body, iterations) for name, body in PROFILES.items()}
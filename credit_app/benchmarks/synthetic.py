@@ -0,0 +1,148 @@
+import random
+from datetime import date, timedelta
+
+from ..models import Customer, Loan
+from ..utils import add_months
+
+# Column headers used by customer_data.xlsx / loan_data.xlsx, so generated
+# files can be fed straight into the ingest tasks.
+CUSTOMER_COLUMNS = [
+    'Customer ID', 'First Name', 'Last Name', 'Age',
+    'Phone Number', 'Monthly Salary', 'Approved Limit',
+]
+LOAN_COLUMNS = [
+    'Customer ID', 'Loan ID', 'Loan Amount', 'Tenure', 'Interest Rate',
+    'Monthly payment', 'EMIs paid on Time', 'Date of Approval', 'End Date',
+]
+
+FIRST_NAMES = [
+    'Aaron', 'Abbey', 'Abbie', 'Abby', 'Abdul', 'Ada', 'Aditi', 'Akash',
+    'Alice', 'Amit', 'Ananya', 'Arjun', 'Bella', 'Carlos', 'Deepa', 'Farah',
+    'Gita', 'Hari', 'Isha', 'Kabir', 'Leela', 'Meera', 'Nikhil', 'Priya',
+    'Rahul', 'Riya', 'Sanjay', 'Tara', 'Vikram', 'Zoya',
+]
+LAST_NAMES = [
+    'Acharya', 'Bose', 'Chopra', 'Das', 'Gupta', 'Iyer', 'Joshi', 'Kapoor',
+    'Kumar', 'Mehta', 'Nair', 'Patel', 'Rao', 'Reddy', 'Shah', 'Sharma',
+    'Singh', 'Smith', 'Verma', 'Yadav',
+]
+
+# Ranges observed in the sample spreadsheets.
+FIRST_APPROVAL_DATE = date(2010, 1, 1)
+LAST_APPROVAL_DATE = date(2023, 8, 30)
+
+
+def _emi(principal, annual_interest_rate, tenure_months):
+    monthly_rate = annual_interest_rate / 12 / 100
+    growth = (1 + monthly_rate) ** tenure_months
+    return round(principal * monthly_rate * growth / (growth - 1))
+
+
+def loan_status_for(end_date, emis_paid_on_time, tenure, today):
+    """Mirrors the status rules used by ingest_loan_data_task."""
+    if end_date < today:
+        return 'paid' if emis_paid_on_time == tenure else 'default'
+    return 'active'
+
+
+def generate_customers(count, rng):
+    """Returns `count` customer rows keyed by the spreadsheet headers."""
+    phone_numbers = rng.sample(range(9100000000, 10000000000), count)
+    customers = []
+    for customer_id in range(1, count + 1):
+        monthly_salary = rng.randrange(32, 300) * 1000
+        customers.append({
+            'Customer ID': customer_id,
+            'First Name': rng.choice(FIRST_NAMES),
+            'Last Name': rng.choice(LAST_NAMES),
+            'Age': rng.randint(20, 70),
+            'Phone Number': phone_numbers[customer_id - 1],
+            'Monthly Salary': monthly_salary,
+            'Approved Limit': round(36 * monthly_salary / 100000) * 100000,
+        })
+    return customers
+
+
+def generate_loans(count, customers, rng, today=None):
+    """Returns `count` loan rows spread over `customers` with replacement."""
+    today = today or date.today()
+    approval_window = (LAST_APPROVAL_DATE - FIRST_APPROVAL_DATE).days
+    loans = []
+    for offset in range(count):
+        customer = rng.choice(customers)
+        loan_amount = rng.randint(1, 10) * 100000
+        tenure = rng.randint(3, 180)
+        interest_rate = round(rng.uniform(8.0, 18.0), 2)
+        start_date = FIRST_APPROVAL_DATE + timedelta(days=rng.randint(0, approval_window))
+        end_date = add_months(start_date, tenure)
+
+        if end_date < today:
+            # Most finished loans were repaid in full, the rest defaulted.
+            emis_paid_on_time = tenure if rng.random() < 0.7 else rng.randint(0, tenure - 1)
+        else:
+            months_elapsed = (today.year - start_date.year) * 12 + today.month - start_date.month
+            emis_paid_on_time = int(max(0, min(tenure, months_elapsed)) * rng.uniform(0.6, 1.0))
+
+        loans.append({
+            'Customer ID': customer['Customer ID'],
+            'Loan ID': 1000 + offset,
+            'Loan Amount': loan_amount,
+            'Tenure': tenure,
+            'Interest Rate': interest_rate,
+            'Monthly payment': _emi(loan_amount, interest_rate, tenure),
+            'EMIs paid on Time': emis_paid_on_time,
+            'Date of Approval': start_date,
+            'End Date': end_date,
+        })
+    return loans
+
+
+def generate_dataset(customer_count, loan_count, seed=0, today=None):
+    rng = random.Random(seed)
+    customers = generate_customers(customer_count, rng)
+    loans = generate_loans(loan_count, customers, rng, today=today)
+    return customers, loans
+
+
+def write_xlsx(rows, columns, path):
+    """Writes rows in the same layout as the source spreadsheets."""
+    import pandas as pd
+
+    pd.DataFrame(rows, columns=columns).to_excel(path, index=False)
+
+
+def load_into_db(customers, loans, today=None, batch_size=1000):
+    """Bulk-loads a generated dataset without going through the ingest tasks."""
+    today = today or date.today()
+    current_debt = {}
+    loan_objects = []
+    for row in loans:
+        loan_status = loan_status_for(row['End Date'], row['EMIs paid on Time'], row['Tenure'], today)
+        if loan_status == 'active':
+            current_debt[row['Customer ID']] = current_debt.get(row['Customer ID'], 0) + row['Loan Amount']
+        loan_objects.append(Loan(
+            loan_id=row['Loan ID'],
+            customer_id=row['Customer ID'],
+            loan_amount=row['Loan Amount'],
+            tenure=row['Tenure'],
+            interest_rate=row['Interest Rate'],
+            monthly_repayment=row['Monthly payment'],
+            emis_paid_on_time=row['EMIs paid on Time'],
+            start_date=row['Date of Approval'],
+            end_date=row['End Date'],
+            loan_status=loan_status,
+        ))
+
+    Customer.objects.bulk_create([
+        Customer(
+            customer_id=row['Customer ID'],
+            first_name=row['First Name'],
+            last_name=row['Last Name'],
+            phone_number=str(row['Phone Number']),
+            monthly_salary=row['Monthly Salary'],
+            approved_limit=row['Approved Limit'],
+            current_debt=current_debt.get(row['Customer ID'], 0),
+        )
+        for row in customers
+    ], batch_size=batch_size)
+    Loan.objects.bulk_create(loan_objects, batch_size=batch_size)
@@ -0,0 +1,70 @@
+import hashlib
+
+from django.db import transaction
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .models import Customer, IngestManifest, Loan
+
+# Model fields each source writes; they are also what the row hash covers,
+# so a loan whose status rolls forward counts as changed.
+CUSTOMER_FIELDS = ['first_name', 'last_name', 'phone_number', 'monthly_salary', 'approved_limit']
+LOAN_FIELDS = [
+    'customer_id', 'loan_amount', 'tenure', 'interest_rate', 'monthly_repayment',
+    'emis_paid_on_time', 'start_date', 'end_date', 'loan_status',
+]
+
+
+def row_hash(obj, fields):
+    values = '\x1f'.join(str(getattr(obj, field)) for field in fields)
+    return hashlib.blake2b(values.encode(), digest_size=16).hexdigest()
+
+
+def changed_rows(source, objects, fields, full=False):
+    """Returns the objects (keyed by primary key) whose hash differs from
+    the manifest, along with every object's hash."""
+    hashes = {key: row_hash(obj, fields) for key, obj in objects.items()}
+    known = {} if full else dict(
+        IngestManifest.objects.filter(source=source).values_list('row_key', 'row_hash').iterator()
+    )
+    changed = [obj for key, obj in objects.items() if known.get(key) != hashes[key]]
+    return changed, hashes
+
+
+def upsert_rows(source, model, objects, hashes, fields, chunk_size, on_chunk=None, after_write=None):
+    """Inserts or updates `objects` and their manifest entries in chunks,
+    one transaction per chunk.
+
+    `after_write(chunk)` updates whatever is derived from the chunk's rows in
+    the same transaction, before the manifest records them. If a later chunk
+    fails, a re-run skips only rows whose derived state is already in place.
+    """
+    for start in range(0, len(objects), chunk_size):
+        chunk = objects[start:start + chunk_size]
+        with transaction.atomic():
+            model.objects.bulk_create(
+                chunk, update_conflicts=True,
+                unique_fields=[model._meta.pk.name], update_fields=fields,
+            )
+            if after_write:
+                after_write(chunk)
+            IngestManifest.objects.bulk_create(
+                [IngestManifest(source=source, row_key=obj.pk, row_hash=hashes[obj.pk]) for obj in chunk],
+                update_conflicts=True,
+                unique_fields=['source', 'row_key'], update_fields=['row_hash', 'ingested_at'],
+            )
+        if on_chunk:
+            on_chunk(start + len(chunk), len(objects))
+
+
+def recompute_current_debt(customer_ids, chunk_size=1000):
+    """Sets current_debt to the principal of the customer's active loans,
+    so repeated ingests never add the same loan twice."""
+    active_principal = Loan.objects.filter(
+        customer=OuterRef('pk'), loan_status='active'
+    ).values('customer').annotate(total=Sum('loan_amount')).values('total')
+    customer_ids = list(customer_ids)
+    for start in range(0, len(customer_ids), chunk_size):
+        Customer.objects.filter(pk__in=customer_ids[start:start + chunk_size]).update(
+            current_debt=Coalesce(Subquery(active_principal), 0)
+        )
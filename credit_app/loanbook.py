@@ -0,0 +1,231 @@
+import json
+import os
+import tempfile
+from datetime import date
+
+import numpy as np
+from django.conf import settings
+
+from .models import Customer, Loan
+from .scoring import COMPONENTS
+
+# One fixed-width record per customer id between the smallest and largest
+# id (customer_id is -1 for gaps), so a customer's record is at
+# customer_id - base_id. Score components for the snapshot's year are
+# precomputed, so scoring reads them straight from the shared mapping.
+CUSTOMER_DTYPE = np.dtype([
+    ('customer_id', '<i8'),
+    ('monthly_salary', '<i8'),
+    ('approved_limit', '<i8'),
+    ('current_debt', '<i8'),
+    ('loan_offset', '<i8'),
+    ('loan_count', '<i4'),
+    ('total_loans', '<i4'),
+    ('on_time_loans', '<i4'),
+    ('active_loans_current_year', '<i4'),
+    ('approved_amount', '<i8'),
+    ('active_principal', '<i8'),
+])
+# Loans sorted by customer; a customer's loans are
+# loans[loan_offset:loan_offset + loan_count].
+LOAN_DTYPE = np.dtype([
+    ('loan_id', '<i8'),
+    ('customer_id', '<i8'),
+    ('loan_amount', '<i8'),
+    ('monthly_repayment', '<i8'),
+    ('tenure', '<i4'),
+    ('emis_paid_on_time', '<i4'),
+    ('start_year', '<i2'),
+    ('status', 'u1'),
+])
+CUSTOMER_ROW_DTYPE = np.dtype([
+    (name, CUSTOMER_DTYPE[name]) for name in ['customer_id', 'monthly_salary', 'approved_limit', 'current_debt']
+])
+LOAN_STATUSES = ['active', 'paid', 'default']
+STATUS_CODES = {status: code for code, status in enumerate(LOAN_STATUSES)}
+
+# File layout: MAGIC, an 8-byte header length, a JSON header, then the two
+# arrays, each starting on an ALIGNMENT boundary.
+MAGIC = b'LOANBK01'
+ALIGNMENT = 64
+CHUNK_SIZE = 2000
+
+# path -> (file identity, LoanBook) for get_loan_book().
+_loaded = {}
+
+
+def loan_rows(chunk_size=CHUNK_SIZE):
+    rows = Loan.objects.order_by('customer_id', 'loan_id').values_list(
+        'loan_id', 'customer_id', 'loan_amount', 'monthly_repayment',
+        'tenure', 'emis_paid_on_time', 'start_date', 'loan_status',
+    ).iterator(chunk_size=chunk_size)
+    for loan_id, customer_id, amount, repayment, tenure, paid_on_time, start_date, status in rows:
+        yield (loan_id, customer_id, amount, repayment, tenure, paid_on_time,
+               start_date.year, STATUS_CODES.get(status, STATUS_CODES['default']))
+
+
+def customer_rows(chunk_size=CHUNK_SIZE):
+    return Customer.objects.order_by('customer_id').values_list(
+        'customer_id', 'monthly_salary', 'approved_limit', 'current_debt'
+    ).iterator(chunk_size=chunk_size)
+
+
+def fill_components(customers, loans, base_id, year):
+    """Writes the score components of every customer for `year`, the same
+    aggregates scoring.compute_components() reads from the loans table."""
+    for name in COMPONENTS:
+        customers[name] = 0
+    if not len(loans):
+        return
+    index = loans['customer_id'] - base_id
+    active = loans['status'] == STATUS_CODES['active']
+    size = len(customers)
+
+    def total(mask, weights=None):
+        if weights is not None:
+            weights = np.where(mask, weights, 0)
+        else:
+            weights = mask
+        return np.bincount(index, weights=weights, minlength=size).round().astype(np.int64)
+
+    customers['total_loans'] = np.bincount(index, minlength=size)
+    customers['on_time_loans'] = total(loans['emis_paid_on_time'] >= loans['tenure'])
+    customers['approved_amount'] = total(True, loans['loan_amount'])
+    customers['active_principal'] = total(active, loans['loan_amount'])
+    customers['active_loans_current_year'] = total(active & (loans['start_year'] == year))
+
+
+class LoanBook:
+    """Columnar snapshot of customers and loans for batch scoring and
+    simulation. Arrays loaded with load() are read-only memory maps, so every
+    process scoring from the same file shares one copy through the page cache.
+    """
+
+    def __init__(self, customers, loans, base_id, year, built_at=None):
+        self.customers = customers
+        self.loans = loans
+        self.base_id = base_id
+        self.year = year
+        self.built_at = built_at
+
+    @classmethod
+    def build(cls, year=None, chunk_size=CHUNK_SIZE):
+        """Streams both tables with values_list(); no model instances are created."""
+        year = year or date.today().year
+        rows = np.fromiter(customer_rows(chunk_size), dtype=CUSTOMER_ROW_DTYPE)
+        base_id = int(rows['customer_id'][0]) if len(rows) else 0
+        size = int(rows['customer_id'][-1]) - base_id + 1 if len(rows) else 0
+
+        customers = np.zeros(size, dtype=CUSTOMER_DTYPE)
+        customers['customer_id'] = -1
+        offsets = rows['customer_id'] - base_id
+        for name in rows.dtype.names:
+            customers[name][offsets] = rows[name]
+        del rows
+
+        loans = np.fromiter(loan_rows(chunk_size), dtype=LOAN_DTYPE)
+        # Loans of customers created after the customer pass have nowhere to go.
+        loans = loans[(loans['customer_id'] >= base_id) & (loans['customer_id'] < base_id + size)]
+        ids = np.arange(base_id, base_id + size)
+        customers['loan_offset'] = np.searchsorted(loans['customer_id'], ids, side='left')
+        customers['loan_count'] = np.searchsorted(loans['customer_id'], ids, side='right') - customers['loan_offset']
+
+        fill_components(customers, loans, base_id, year)
+        return cls(customers, loans, base_id, year, built_at=date.today().isoformat())
+
+    def save(self, path):
+        """Writes the snapshot to `path`, replacing any previous file
+        atomically; processes that mapped the old file keep reading it."""
+        header = {
+            'base_id': self.base_id,
+            'year': self.year,
+            'built_at': self.built_at,
+            'customers': {'dtype': CUSTOMER_DTYPE.descr, 'count': len(self.customers)},
+            'loans': {'dtype': LOAN_DTYPE.descr, 'count': len(self.loans)},
+        }
+        # Offsets depend on the header length, which depends on the offsets'
+        # digits; reserving space for them up front settles it in one pass.
+        header['customers']['offset'] = header['loans']['offset'] = 10 ** 15
+        header_size = len(json.dumps(header).encode())
+        position = align(len(MAGIC) + 8 + header_size)
+        for name, array in (('customers', self.customers), ('loans', self.loans)):
+            header[name]['offset'] = position
+            position = align(position + array.nbytes)
+        encoded = json.dumps(header).encode().ljust(header_size)
+
+        directory = os.path.dirname(os.path.abspath(path))
+        handle, temp_path = tempfile.mkstemp(dir=directory, prefix='.loan_book')
+        try:
+            os.fchmod(handle, 0o644)
+            with os.fdopen(handle, 'wb') as output:
+                output.write(MAGIC)
+                output.write(len(encoded).to_bytes(8, 'little'))
+                output.write(encoded)
+                for name, array in (('customers', self.customers), ('loans', self.loans)):
+                    output.seek(header[name]['offset'])
+                    output.write(np.ascontiguousarray(array).view(np.uint8).data)
+                output.truncate(position)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as source:
+            if source.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f'{path} is not a loan book snapshot')
+            header = json.loads(source.read(int.from_bytes(source.read(8), 'little')))
+
+        arrays = {}
+        for name, dtype in (('customers', CUSTOMER_DTYPE), ('loans', LOAN_DTYPE)):
+            section = header[name]
+            if np.dtype([tuple(field) for field in section['dtype']]) != dtype:
+                raise ValueError(f'{path} was written with a different {name} layout; rebuild it')
+            if section['count']:
+                arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=section['offset'], shape=(section['count'],))
+            else:
+                arrays[name] = np.zeros(0, dtype=dtype)
+        return cls(arrays['customers'], arrays['loans'], header['base_id'], header['year'], header['built_at'])
+
+    def offsets(self, customer_ids):
+        """Record offsets of `customer_ids`, -1 for ids not in the snapshot."""
+        offsets = np.asarray(customer_ids, dtype=np.int64) - self.base_id
+        known = (offsets >= 0) & (offsets < len(self.customers))
+        offsets = np.where(known, offsets, 0)
+        if len(self.customers):
+            known &= self.customers['customer_id'][offsets] >= 0
+        return np.where(known, offsets, -1)
+
+    def customer_loans(self, customer_id):
+        offset = self.offsets([customer_id])[0]
+        if offset < 0:
+            return self.loans[:0]
+        record = self.customers[offset]
+        return self.loans[record['loan_offset']:record['loan_offset'] + record['loan_count']]
+
+    def for_year(self, year):
+        """The snapshot with components for `year`. Only "current year"
+        activity depends on it, so this is a private copy of the customer
+        records and nothing else."""
+        if year == self.year:
+            return self
+        customers = np.array(self.customers)
+        fill_components(customers, self.loans, self.base_id, year)
+        return LoanBook(customers, self.loans, self.base_id, year, self.built_at)
+
+
+def align(position):
+    return -(-position // ALIGNMENT) * ALIGNMENT
+
+
+def get_loan_book(path=None):
+    """The snapshot at `path` (settings.LOAN_BOOK_PATH by default), mapped
+    once per process and remapped when the file is rebuilt."""
+    path = path or settings.LOAN_BOOK_PATH
+    stat = os.stat(path)
+    identity = (stat.st_ino, stat.st_mtime_ns)
+    cached = _loaded.get(path)
+    if cached is None or cached[0] != identity:
+        cached = _loaded[path] = (identity, LoanBook.load(path))
+    return cached[1]
@@ -0,0 +1,151 @@
+import os
+import tempfile
+from contextlib import redirect_stdout
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (
+    override_settings, setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+)
+
+from credit_app.benchmarks import endpoints, micro, startup, synthetic
+from credit_app.benchmarks.results import (
+    compare_results, environment_metadata, load_results, write_results
+)
+from credit_app.models import Customer, Loan
+from credit_app.scoring import update_snapshots
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks the API endpoints, credit scoring and ingestion against a '
+        'throwaway test database filled with synthetic data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=300)
+        parser.add_argument('--loans', type=int, default=800)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--iterations', type=int, default=50,
+                            help='Timed requests per endpoint.')
+        parser.add_argument('--alloc-iterations', type=int, default=10,
+                            help='Requests per endpoint traced with tracemalloc.')
+        parser.add_argument('--micro-iterations', type=int, default=1000)
+        parser.add_argument('--ingest-iterations', type=int, default=1)
+        parser.add_argument('--skip-ingest', action='store_true',
+                            help='Bulk-load the dataset instead of timing the ingest tasks.')
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--load-requests', type=int, default=50,
+                            help='Requests per load-driver thread.')
+        parser.add_argument('--startup-iterations', type=int, default=5,
+                            help='Fresh interpreters started per process type (0 to skip).')
+        parser.add_argument('--output', help='Write the JSON results to this path.')
+        parser.add_argument('--compare', help='Baseline results file to gate against.')
+        parser.add_argument('--max-slowdown', type=float, default=0.25)
+        parser.add_argument('--max-alloc-growth', type=float, default=0.25)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        # Like the test runner, this points any DB_REPLICAS aliases (TEST
+        # MIRROR) at the test database, so replica reads see the data.
+        old_config = setup_databases(verbosity=0, interactive=False, serialized_aliases=set())
+        try:
+            # The views and tasks print debug output on every call, and the
+            # query inspection middleware would add its own overhead.
+            with open(os.devnull, 'w') as devnull, redirect_stdout(devnull), override_settings(
+                QUERY_INSPECTION={**settings.QUERY_INSPECTION, 'ENABLED': False}
+            ):
+                results = self.run_benchmarks(options)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        if options['startup_iterations']:
+            results['startup'] = startup.bench_startup(options['startup_iterations'])
+
+        report = {
+            'metadata': environment_metadata(
+                customers=options['customers'],
+                loans=options['loans'],
+                seed=options['seed'],
+            ),
+            'results': results,
+        }
+        self.print_summary(results)
+
+        if options['output']:
+            write_results(report, options['output'])
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+        if options['compare']:
+            regressions = compare_results(
+                load_results(options['compare']), report,
+                max_slowdown=options['max_slowdown'],
+                max_alloc_growth=options['max_alloc_growth'],
+            )
+            if regressions:
+                raise CommandError('Performance regressions against baseline:\n  ' + '\n  '.join(regressions))
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['compare']}"))
+
+    def run_benchmarks(self, options):
+        customers, loans = synthetic.generate_dataset(
+            options['customers'], options['loans'], seed=options['seed']
+        )
+        results = {'micro': {}}
+
+        if options['skip_ingest']:
+            synthetic.load_into_db(customers, loans)
+        else:
+            with tempfile.TemporaryDirectory() as workdir:
+                results['micro'].update(
+                    micro.bench_ingest(customers, loans, workdir, options['ingest_iterations'])
+                )
+
+        customer_ids = list(Customer.objects.values_list('customer_id', flat=True))
+        # Scores are read from snapshots kept current by every write, so
+        # measure that steady state rather than each customer's first
+        # request, which writes the backfill snapshot.
+        update_snapshots(customer_ids, 'backfill')
+        loan_ids = list(Loan.objects.values_list('loan_id', flat=True))
+
+        results['micro']['calculate_emi'] = micro.bench_calculate_emi(options['micro_iterations'])
+        results['micro']['calculate_credit_score'] = micro.bench_calculate_credit_score(
+            customer_ids, options['iterations'], seed=options['seed']
+        )
+        with tempfile.TemporaryDirectory() as workdir:
+            results['micro']['calculate_credit_scores'] = micro.bench_batch_scoring(
+                customer_ids, workdir, max(1, options['iterations'] // 10)
+            )
+
+        scenarios = endpoints.default_scenarios(customer_ids, loan_ids)
+        results['endpoints'] = {
+            scenario.name: endpoints.measure_endpoint(
+                scenario, options['iterations'], options['alloc_iterations'], seed=options['seed']
+            )
+            for scenario in scenarios
+        }
+        results['load'] = endpoints.run_load(
+            scenarios, options['concurrency'], options['load_requests'], seed=options['seed']
+        )
+        return results
+
+    def print_summary(self, results):
+        self.stdout.write('endpoint              p50 ms    p95 ms  queries  alloc KiB')
+        for name, data in results['endpoints'].items():
+            self.stdout.write(
+                f"{name:<20} {data['latency_ms']['p50']:>7.2f} {data['latency_ms']['p95']:>9.2f}"
+                f" {data['queries']['max']:>8} {data['alloc_kib']['mean']:>10.1f}"
+            )
+        for name, data in results['micro'].items():
+            self.stdout.write(f"{name:<30} p50 {data['time_us']['p50']:.1f} us")
+        for name, data in results.get('startup', {}).items():
+            rss = f"{data['rss_kib']['p50'] / 1024:.1f} MiB RSS" if 'rss_kib' in data else 'RSS n/a'
+            self.stdout.write(
+                f"startup {name:<8} {data['startup_ms']['p50']:.0f} ms, "
+                f"{rss}, heavy modules: {', '.join(data['heavy_modules']) or 'none'}"
+            )
+        load = results['load']
+        self.stdout.write(
+            f"load: {load['requests']} requests x{load['concurrency']} threads, "
+            f"{load['throughput_rps']} req/s, p95 {load['latency_ms']['p95']} ms, {load['errors']} errors"
+        )
@@ -3,21 +3,26 @@ from credit_app.tasks import ingest_customer_data_task, ingest_loan_data_task
 import os
 
 class Command(BaseCommand):
-    help = 'Ingests initial customer and loan data from Excel files.'
+    help = 'Ingests new or changed customer and loan data from Excel files.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Rewrite every row instead of only new or changed ones.')
 
     def handle(self, *args, **options):
+        full = options['full']
         customer_file = os.path.join(os.getcwd(), 'customer_data.xlsx') 
         loan_file = os.path.join(os.getcwd(), 'loan_data.xlsx') 
 
         if os.path.exists(customer_file):
             self.stdout.write(self.style.SUCCESS(f'Queuing customer data ingestion from {customer_file}...'))
-            ingest_customer_data_task.delay(customer_file)
+            ingest_customer_data_task.delay(customer_file, full=full)
         else:
             self.stdout.write(self.style.ERROR(f'Customer data file not found: {customer_file}'))
 
         if os.path.exists(loan_file):
             self.stdout.write(self.style.SUCCESS(f'Queuing loan data ingestion from {loan_file}...'))
-            ingest_loan_data_task.delay(loan_file)
+            ingest_loan_data_task.delay(loan_file, full=full)
         else:
             self.stdout.write(self.style.ERROR(f'Loan data file not found: {loan_file}'))
 
@@ -0,0 +1,60 @@
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import routers
+from .querycount import get_config, record_queries, report
+
+PIN_COOKIE = 'pin_primary'
+
+
+class QueryInspectionMiddleware:
+    """Records the SQL run by each request, logs query budget overruns and
+    likely N+1 patterns, and optionally exposes DB time as Server-Timing."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.config = get_config()
+        if not self.config['ENABLED']:
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        with record_queries() as log:
+            response = self.get_response(request)
+
+        match = request.resolver_match
+        report(match.url_name if match else request.path, log, self.config)
+
+        if self.config['SERVER_TIMING']:
+            response['Server-Timing'] = f'db;dur={log.duration * 1000:.2f};desc="{log.count} queries"'
+        return response
+
+
+class PrimaryPinningMiddleware:
+    """Scopes replica routing to the request. A request that writes sets a
+    short-lived cookie so the client's next requests read from the primary
+    and see their own writes (e.g. /view-loan right after /create-loan).
+    Views that read and then write, like CreateLoanView, opt out of
+    replica reads entirely with `read_from_replica = False`."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.config = routers.get_config()
+        if not self.config['REPLICAS']:
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        token = routers.start_request(pinned=PIN_COOKIE in request.COOKIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            state = routers.end_request(token)
+
+        if state.wrote:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=self.config['PIN_SECONDS'], httponly=True, samesite='Lax'
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'view_class', None)
+        if not getattr(view_class, 'read_from_replica', True):
+            routers.pin_request()
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('credit_app', '0002_alter_customer_approved_limit_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestManifest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=20)),
+                ('row_key', models.BigIntegerField()),
+                ('row_hash', models.CharField(max_length=32)),
+                ('ingested_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='ingestmanifest',
+            constraint=models.UniqueConstraint(fields=('source', 'row_key'), name='unique_ingest_manifest_row'),
+        ),
+    ]
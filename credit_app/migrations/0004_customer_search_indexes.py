@@ -0,0 +1,45 @@
+from django.db import migrations
+
+# Customer search (CustomerSearchView) filters with icontains on the name
+# columns, which PostgreSQL runs as UPPER("first_name"::text) LIKE UPPER(...).
+# The pg_trgm GIN indexes are on that expression, since an index on the bare
+# column can't serve it. The phone prefix search (startswith) is already
+# served by the varchar_pattern_ops index Django creates for the unique
+# phone_number column. Other databases, i.e. SQLite in tests, fall back to
+# scanning.
+SEARCH_INDEXES = [
+    ('credit_app_customer_first_name_trgm', 'USING gin ((UPPER(first_name::text)) gin_trgm_ops)'),
+    ('credit_app_customer_last_name_trgm', 'USING gin ((UPPER(last_name::text)) gin_trgm_ops)'),
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, definition in SEARCH_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON credit_app_customer {definition}'
+        )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in SEARCH_INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction, and keeps
+    # the customer table writable while the indexes build.
+    atomic = False
+
+    dependencies = [
+        ('credit_app', '0003_ingestmanifest'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('credit_app', '0004_customer_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CreditScoreSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.IntegerField()),
+                ('reason', models.CharField(max_length=20)),
+                ('year', models.IntegerField()),
+                ('total_loans', models.IntegerField(default=0)),
+                ('on_time_loans', models.IntegerField(default=0)),
+                ('approved_amount', models.BigIntegerField(default=0)),
+                ('active_principal', models.BigIntegerField(default=0)),
+                ('active_loans_current_year', models.IntegerField(default=0)),
+                ('current_debt', models.BigIntegerField(default=0)),
+                ('approved_limit', models.BigIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='credit_score_snapshots', to='credit_app.customer')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['customer', '-id'], name='credit_score_latest_idx')],
+            },
+        ),
+    ]
@@ -25,4 +25,46 @@ class Loan(models.Model):
     loan_status = models.CharField(max_length=20, default='active')
 
     def __str__(self):
-        return f"Loan {self.loan_id} for {self.customer.first_name}"
\ No newline at end of file
+        return f"Loan {self.loan_id} for {self.customer.first_name}"
+
+class IngestManifest(models.Model):
+    """Hash of the last ingested version of each source row, so re-running
+    an ingest only writes rows that are new or changed."""
+    source = models.CharField(max_length=20)
+    row_key = models.BigIntegerField()
+    row_hash = models.CharField(max_length=32)
+    ingested_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'row_key'], name='unique_ingest_manifest_row'),
+        ]
+
+    def __str__(self):
+        return f"{self.source} {self.row_key}"
+
+
+class CreditScoreSnapshot(models.Model):
+    """A customer's credit score and the loan aggregates it was computed
+    from, written whenever those inputs change (see credit_app.scoring)."""
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='credit_score_snapshots')
+    score = models.IntegerField()
+    reason = models.CharField(max_length=20)
+    # The calendar year the current-year activity component refers to.
+    year = models.IntegerField()
+    total_loans = models.IntegerField(default=0)
+    on_time_loans = models.IntegerField(default=0)
+    approved_amount = models.BigIntegerField(default=0)
+    active_principal = models.BigIntegerField(default=0)
+    active_loans_current_year = models.IntegerField(default=0)
+    current_debt = models.BigIntegerField(default=0)
+    approved_limit = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['customer', '-id'], name='credit_score_latest_idx'),
+        ]
+
+    def __str__(self):
+        return f"Score {self.score} for customer {self.customer_id}"
@@ -0,0 +1,137 @@
+import logging
+import re
+import time
+from collections import Counter, namedtuple
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+RecordedQuery = namedtuple('RecordedQuery', ['alias', 'sql', 'duration'])
+
+DEFAULT_CONFIG = {
+    'ENABLED': False,
+    'SERVER_TIMING': False,
+    # A query shape seen at least this many times in one request is
+    # reported as a likely N+1.
+    'DUPLICATE_THRESHOLD': 2,
+    # Maximum queries per URL name or Celery task name.
+    'BUDGETS': {},
+}
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def get_config():
+    return {**DEFAULT_CONFIG, **getattr(settings, 'QUERY_INSPECTION', {})}
+
+
+def query_shape(sql):
+    """Django passes parameters separately, so the SQL text is already the
+    shape of the query once whitespace and IN lists are normalised."""
+    return _IN_LIST.sub('IN (...)', _WHITESPACE.sub(' ', sql).strip())
+
+
+class QueryRecorder:
+    """`connection.execute_wrapper` callable that records every query."""
+
+    def __init__(self, alias, queries):
+        self.alias = alias
+        self.queries = queries
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(RecordedQuery(self.alias, sql, time.perf_counter() - started))
+
+
+class QueryLog:
+    def __init__(self):
+        self.queries = []
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def duration(self):
+        return sum(query.duration for query in self.queries)
+
+    def duplicates(self, threshold=None):
+        """Query shapes executed at least `threshold` times, most frequent first."""
+        if threshold is None:
+            threshold = get_config()['DUPLICATE_THRESHOLD']
+        counts = Counter(query_shape(query.sql) for query in self.queries)
+        return [(shape, count) for shape, count in counts.most_common() if count >= threshold]
+
+    def describe(self):
+        lines = [f"{self.count} queries in {self.duration * 1000:.2f} ms"]
+        for shape, count in self.duplicates():
+            lines.append(f"  {count}x {shape}")
+        return '\n'.join(lines)
+
+
+@contextmanager
+def record_queries():
+    """Records the queries run on every configured database in this thread."""
+    log = QueryLog()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            recorder = QueryRecorder(connection.alias, log.queries)
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield log
+
+
+@contextmanager
+def query_budget(label, budget=None, allow_duplicates=True):
+    """Fails with QueryBudgetExceeded if the block runs more queries than
+    the budget configured for `label` (a URL name or task name)."""
+    if budget is None:
+        budget = get_config()['BUDGETS'][label]
+    with record_queries() as log:
+        yield log
+    if log.count > budget:
+        raise QueryBudgetExceeded(f"{label} exceeded its budget of {budget}: {log.describe()}")
+    if not allow_duplicates and log.duplicates():
+        raise QueryBudgetExceeded(f"{label} repeated query shapes: {log.describe()}")
+
+
+def report(label, log, config=None):
+    """Logs budget overruns and repeated query shapes for a request or task."""
+    config = config or get_config()
+    budget = config['BUDGETS'].get(label)
+    if budget is not None and log.count > budget:
+        logger.warning("%s exceeded its query budget of %s: %s", label, budget, log.describe())
+    elif log.duplicates(config['DUPLICATE_THRESHOLD']):
+        logger.warning("Possible N+1 in %s: %s", label, log.describe())
+
+
+_task_logs = {}
+
+
+def _task_prerun(task_id=None, **kwargs):
+    stack = ExitStack()
+    _task_logs[task_id] = (stack, stack.enter_context(record_queries()))
+
+
+def _task_postrun(task_id=None, task=None, **kwargs):
+    stack, log = _task_logs.pop(task_id, (None, None))
+    if stack is not None:
+        stack.close()
+        report(task.name, log)
+
+
+def connect_task_signals():
+    from celery.signals import task_postrun, task_prerun
+
+    task_prerun.connect(_task_prerun, dispatch_uid='credit_app.querycount.prerun')
+    task_postrun.connect(_task_postrun, dispatch_uid='credit_app.querycount.postrun')
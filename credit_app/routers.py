@@ -0,0 +1,112 @@
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+DEFAULT_CONFIG = {
+    # Aliases in DATABASES that replicate DEFAULT_DB_ALIAS.
+    'REPLICAS': [],
+    # Replicas further behind than this (seconds) are skipped.
+    'MAX_LAG': 5,
+    # How long a replica's lag reading is reused before checking again.
+    'CHECK_INTERVAL': 5,
+    # How long a client keeps reading from the primary after it writes.
+    'PIN_SECONDS': 10,
+}
+
+# State of the request being served, or None outside a request. Reads are
+# only sent to replicas inside a request; tasks and management commands
+# keep reading their own writes from the primary.
+_request_state = ContextVar('credit_app_replica_request', default=None)
+
+# alias -> (checked_at, healthy)
+_health = {}
+
+_POSTGRES_LAG_SQL = """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+class RequestState:
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+def get_config():
+    return {**DEFAULT_CONFIG, **getattr(settings, 'DATABASE_REPLICATION', {})}
+
+
+def start_request(pinned=False):
+    return _request_state.set(RequestState(pinned))
+
+
+def end_request(token):
+    state = _request_state.get()
+    _request_state.reset(token)
+    return state
+
+
+def pin_request():
+    """Sends the rest of the current request to the primary."""
+    state = _request_state.get()
+    if state is not None:
+        state.pinned = True
+
+
+def replica_lag(alias):
+    """Seconds the replica is behind the primary. SQLite copies used for
+    local testing have no replication and never lag."""
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(_POSTGRES_LAG_SQL)
+        return float(cursor.fetchone()[0])
+
+
+def is_healthy(alias, config):
+    now = time.monotonic()
+    checked_at, healthy = _health.get(alias, (None, False))
+    if checked_at is None or now - checked_at >= config['CHECK_INTERVAL']:
+        try:
+            healthy = replica_lag(alias) <= config['MAX_LAG']
+        except DatabaseError:
+            healthy = False
+        _health[alias] = (now, healthy)
+    return healthy
+
+
+class ReplicaRouter:
+    """Sends reads made while serving a request to a healthy replica and
+    everything else to the primary. Once a request writes it is pinned to
+    the primary; PrimaryPinningMiddleware carries that over to the client's
+    next requests."""
+
+    def db_for_read(self, model, **hints):
+        state = _request_state.get()
+        if state is None or state.pinned:
+            return DEFAULT_DB_ALIAS
+        config = get_config()
+        replicas = [alias for alias in config['REPLICAS'] if is_healthy(alias, config)]
+        return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state.pinned = state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *get_config()['REPLICAS']}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in get_config()['REPLICAS']
@@ -0,0 +1,202 @@
+import logging
+from datetime import date
+
+from django.db import router, transaction
+from django.db.models import Count, F, Max, Q, Sum
+
+from .models import CreditScoreSnapshot, Customer, Loan
+
+# Loan aggregates a score is computed from. Each loan contributes to them
+# independently, so a snapshot can be moved forward by adding the
+# contribution of new or changed loans and subtracting their old one.
+COMPONENTS = [
+    'total_loans', 'on_time_loans', 'approved_amount',
+    'active_principal', 'active_loans_current_year',
+]
+LOAN_STATE_FIELDS = [
+    'customer_id', 'loan_amount', 'tenure', 'emis_paid_on_time', 'start_date', 'loan_status',
+]
+
+CHUNK_SIZE = 1000
+
+logger = logging.getLogger(__name__)
+
+
+def loan_state(loan):
+    """The fields of a Loan that feed the score, as a plain dict."""
+    return {field: getattr(loan, field) for field in LOAN_STATE_FIELDS}
+
+
+def loan_components(state, year):
+    active = state['loan_status'] == 'active'
+    return {
+        'total_loans': 1,
+        'on_time_loans': int(state['emis_paid_on_time'] >= state['tenure']),
+        'approved_amount': int(state['loan_amount']),
+        'active_principal': int(state['loan_amount']) if active else 0,
+        'active_loans_current_year': int(active and state['start_date'].year == year),
+    }
+
+
+def score_from_components(components, current_debt, approved_limit):
+    credit_score = 0
+    if components['on_time_loans'] > 0:
+        credit_score += 20
+    if components['total_loans'] > 0:
+        credit_score += min(20, components['total_loans'] * 5)
+    if components['active_loans_current_year'] > 0:
+        credit_score += min(10, components['active_loans_current_year'] * 2)
+    if components['approved_amount'] > 0:
+        credit_score += min(20, int(components['approved_amount'] / 10000))
+    if current_debt + components['active_principal'] > approved_limit:
+        credit_score = 0
+    return max(0, min(100, credit_score))
+
+
+def compute_components(customer_ids, year, using=None):
+    """Full recompute from the loans table, one grouped query."""
+    components = {customer_id: dict.fromkeys(COMPONENTS, 0) for customer_id in customer_ids}
+    rows = Loan.objects.db_manager(using).filter(customer_id__in=customer_ids).values('customer_id').annotate(
+        total_loans=Count('loan_id'),
+        on_time_loans=Count('loan_id', filter=Q(emis_paid_on_time__gte=F('tenure'))),
+        approved_amount=Sum('loan_amount'),
+        active_principal=Sum('loan_amount', filter=Q(loan_status='active')),
+        active_loans_current_year=Count('loan_id', filter=Q(loan_status='active', start_date__year=year)),
+    )
+    for row in rows:
+        components[row['customer_id']] = {name: int(row[name] or 0) for name in COMPONENTS}
+    return components
+
+
+def latest_snapshots(customer_ids, using=None):
+    snapshots = CreditScoreSnapshot.objects.db_manager(using)
+    latest_ids = snapshots.filter(
+        customer_id__in=customer_ids
+    ).values('customer_id').annotate(latest=Max('id')).values('latest')
+    return {snapshot.customer_id: snapshot for snapshot in snapshots.filter(id__in=latest_ids)}
+
+
+def latest_snapshot(customer_id):
+    return CreditScoreSnapshot.objects.filter(customer_id=customer_id).order_by('-id').first()
+
+
+def update_snapshots(customer_ids, reason, loan_changes=None, only_existing=False):
+    """Writes a new snapshot for every customer whose score inputs changed.
+
+    `loan_changes` is a list of (old_state, new_state) pairs from loan_state(),
+    either side None for an inserted or removed loan; [] means no loan
+    changed (only current_debt or approved_limit may have). A customer's
+    previous snapshot from the current year is moved forward by those
+    deltas; anyone without one, or when loan_changes is None, is recomputed
+    from the loans table. With `only_existing`, customers without a snapshot
+    are left to be backfilled on their next request.
+
+    Each chunk of customers is locked (select_for_update) while its previous
+    snapshots are read and the new ones written, so concurrent updates for
+    the same customer apply their deltas one after the other instead of both
+    building on the same base. Callers that change loans or debt should call
+    this inside the transaction that makes the change.
+
+    Returns the latest snapshot of each customer.
+    """
+    year = date.today().year
+    deltas = {}
+    for old, new in loan_changes or []:
+        for state, sign in ((old, -1), (new, 1)):
+            if state is None:
+                continue
+            delta = deltas.setdefault(state['customer_id'], dict.fromkeys(COMPONENTS, 0))
+            for name, value in loan_components(state, year).items():
+                delta[name] += sign * value
+
+    # Everything is read from the database the snapshots are written to,
+    # never from a replica that may not have the latest snapshot yet.
+    using = router.db_for_write(CreditScoreSnapshot)
+    customer_ids = sorted(customer_ids)
+    result = {}
+    for start in range(0, len(customer_ids), CHUNK_SIZE):
+        with transaction.atomic(using=using, savepoint=False):
+            result.update(_update_chunk(
+                customer_ids[start:start + CHUNK_SIZE], reason, deltas, loan_changes is None,
+                only_existing, year, using,
+            ))
+    return result
+
+
+def _update_chunk(chunk, reason, deltas, recompute, only_existing, year, using):
+    # Customers are locked in id order, so concurrent chunks can't deadlock.
+    customers = {
+        customer_id: (current_debt, approved_limit)
+        for customer_id, current_debt, approved_limit in Customer.objects.db_manager(using).select_for_update().filter(
+            customer_id__in=chunk
+        ).order_by('customer_id').values_list('customer_id', 'current_debt', 'approved_limit')
+    }
+    previous = latest_snapshots(chunk, using)
+    if only_existing:
+        customers = {customer_id: values for customer_id, values in customers.items() if customer_id in previous}
+
+    stale = [
+        customer_id for customer_id in customers
+        if recompute or customer_id not in previous or previous[customer_id].year != year
+    ]
+    recomputed = compute_components(stale, year, using) if stale else {}
+
+    result = {}
+    snapshots = []
+    for customer_id, (current_debt, approved_limit) in customers.items():
+        before = previous.get(customer_id)
+        if customer_id in recomputed:
+            components = recomputed[customer_id]
+        else:
+            delta = deltas.get(customer_id, {})
+            components = {name: getattr(before, name) + delta.get(name, 0) for name in COMPONENTS}
+
+        snapshot = CreditScoreSnapshot(
+            customer_id=customer_id,
+            score=score_from_components(components, current_debt, approved_limit),
+            reason=reason if before is None or before.year == year else 'year_rollover',
+            year=year,
+            current_debt=current_debt,
+            approved_limit=approved_limit,
+            **components,
+        )
+        if before is not None and all(
+            getattr(before, field) == getattr(snapshot, field)
+            for field in COMPONENTS + ['score', 'year', 'current_debt', 'approved_limit']
+        ):
+            result[customer_id] = before
+            continue
+        snapshots.append(snapshot)
+        result[customer_id] = snapshot
+
+    CreditScoreSnapshot.objects.using(using).bulk_create(snapshots)
+    return result
+
+
+def reconcile_snapshots(chunk_size=CHUNK_SIZE):
+    """Compares every current-year latest snapshot with a full recompute
+    from the loans table and rewrites the ones that drifted, so a missed or
+    misapplied delta doesn't persist until the year rolls over.
+
+    Returns the ids of the customers whose snapshot was rewritten.
+    """
+    year = date.today().year
+    using = router.db_for_write(CreditScoreSnapshot)
+    customer_ids = list(
+        CreditScoreSnapshot.objects.db_manager(using).filter(year=year)
+        .values_list('customer_id', flat=True).distinct().order_by('customer_id')
+    )
+    drifted = []
+    for start in range(0, len(customer_ids), chunk_size):
+        chunk = customer_ids[start:start + chunk_size]
+        previous = latest_snapshots(chunk, using)
+        expected = compute_components(chunk, year, using)
+        drifted.extend(
+            customer_id for customer_id, snapshot in previous.items()
+            if snapshot.year == year
+            and any(getattr(snapshot, name) != expected[customer_id][name] for name in COMPONENTS)
+        )
+    if drifted:
+        logger.warning('Credit score snapshots of %d customers drifted from their loans: %s', len(drifted), drifted[:20])
+        update_snapshots(drifted, 'reconcile')
+    return drifted
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Customer, Loan
+from .models import Customer, Loan, CreditScoreSnapshot
 
 class CustomerSerializer(serializers.ModelSerializer):
     class Meta:
@@ -69,4 +69,32 @@ class LoanListItemSerializer(serializers.Serializer):
     loan_amount = serializers.DecimalField(max_digits=12, decimal_places=2)
     interest_rate = serializers.DecimalField(max_digits=5, decimal_places=2)
     monthly_installment = serializers.DecimalField(max_digits=12, decimal_places=2)
-    repayments_left = serializers.IntegerField()
\ No newline at end of file
+    repayments_left = serializers.IntegerField()
+
+class CustomerSearchRequestSerializer(serializers.Serializer):
+    q = serializers.CharField(min_length=3, max_length=100)
+    cursor = serializers.IntegerField(required=False, min_value=0)
+    limit = serializers.IntegerField(required=False, default=20, min_value=1, max_value=100)
+
+class CustomerExposureSerializer(serializers.Serializer):
+    active_loans = serializers.IntegerField()
+    active_principal = serializers.DecimalField(max_digits=12, decimal_places=2)
+    monthly_installments = serializers.DecimalField(max_digits=12, decimal_places=2)
+    current_debt = serializers.DecimalField(max_digits=12, decimal_places=2)
+    approved_limit = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+class CustomerSearchResultSerializer(serializers.Serializer):
+    customer_id = serializers.IntegerField()
+    first_name = serializers.CharField()
+    last_name = serializers.CharField()
+    phone_number = serializers.CharField()
+    exposure = CustomerExposureSerializer()
+
+
+class CreditScoreSnapshotSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CreditScoreSnapshot
+        fields = [
+            'score', 'reason', 'created_at', 'year', 'total_loans', 'on_time_loans', 'approved_amount',
+            'active_principal', 'active_loans_current_year', 'current_debt', 'approved_limit',
+        ]
@@ -1,76 +1,173 @@
-import pandas as pd
 from celery import shared_task
+from django.conf import settings
 from django.db import transaction
+from django.db.models import F
 from .models import Customer, Loan
-from datetime import datetime
+from .ingest import (
+    CUSTOMER_FIELDS, LOAN_FIELDS, changed_rows, recompute_current_debt, upsert_rows
+)
+from .scoring import LOAN_STATE_FIELDS, loan_state, reconcile_snapshots, update_snapshots
+from datetime import date, datetime
+
+# pandas (and openpyxl, which read_excel loads) are imported inside the
+# ingest tasks so web and worker processes that never ingest don't pay for them.
+# numpy, which the loan book needs, is kept out the same way.
+
+# Rows written per transaction; progress is reported after each chunk.
+INGEST_CHUNK_SIZE = 1000
+
+
+def report_progress(task, processed, total):
+    # Calling a task function directly (tests, benchmarks) has no request id
+    # and nowhere to store progress.
+    if task.request.id:
+        task.update_state(state='PROGRESS', meta={'processed': processed, 'total': total})
+
+
+@shared_task(bind=True, acks_late=True)
+def ingest_customer_data_task(self, file_path, full=False):
+    """Upserts new or changed customer rows. `full` ignores the manifest
+    and rewrites every row."""
+    import pandas as pd
 
-@shared_task
-def ingest_customer_data_task(file_path):
     df = pd.read_excel(file_path)
-    customers_to_create = []
-    for index, row in df.iterrows():
+    customers = {}
+    for _, row in df.iterrows():
+        customer_id = int(row['Customer ID'])
+        # The first occurrence of a duplicated ID wins.
+        if customer_id in customers:
+            continue
 
         approved_limit = round(36 * row['Monthly Salary'] / 100000) * 100000
-        customers_to_create.append(
-            Customer(
-                customer_id=row['Customer ID'],
-                first_name=row['First Name'],
-                last_name=row['Last Name'],
-                phone_number=str(row['Phone Number']),  
-                monthly_salary=row['Monthly Salary'],
-                approved_limit=approved_limit,
-                current_debt=0  
-            )
+        customers[customer_id] = Customer(
+            customer_id=customer_id,
+            first_name=row['First Name'],
+            last_name=row['Last Name'],
+            phone_number=str(row['Phone Number']),
+            monthly_salary=int(row['Monthly Salary']),
+            approved_limit=int(approved_limit),
+            current_debt=0
         )
-    with transaction.atomic():
-        Customer.objects.bulk_create(customers_to_create, ignore_conflicts=True)
-    print("Customer data ingestion complete.")
 
-@shared_task
-def ingest_loan_data_task(file_path):
+    changed, hashes = changed_rows('customer', customers, CUSTOMER_FIELDS, full=full)
+    upsert_rows(
+        'customer', Customer, changed, hashes, CUSTOMER_FIELDS, INGEST_CHUNK_SIZE,
+        on_chunk=lambda done, total: report_progress(self, done, total),
+        # Customers without a snapshot get one on their next request.
+        after_write=lambda chunk: update_snapshots(
+            [customer.customer_id for customer in chunk], 'ingest', [], only_existing=True
+        ),
+    )
+    print(f"Customer data ingestion complete: {len(changed)} of {len(df)} rows new or changed.")
+    return {'processed': len(df), 'changed': len(changed)}
+
+@shared_task(bind=True, acks_late=True)
+def ingest_loan_data_task(self, file_path, full=False):
+    """Upserts new or changed loan rows and recomputes current_debt for
+    every customer whose loans changed. `full` ignores the manifest."""
+    import pandas as pd
+
     df = pd.read_excel(file_path)
-    loans_to_create = []
-    for index, row in df.iterrows():
-        try:
-            customer = Customer.objects.get(customer_id=row['Customer ID'])
-            
-            start_date = pd.to_datetime(row['Date of Approval']).date()
-            end_date = pd.to_datetime(row['End Date']).date()
-            
-
-            current_date = datetime.now().date()
-            loan_status = 'active'
-            if end_date < current_date:
-                if row['EMIs paid on Time'] == row['Tenure']:
-                    loan_status = 'paid'
-                else:
-                    loan_status = 'default'
-            
-            loans_to_create.append(
-                Loan(
-                    loan_id=row['Loan ID'],
-                    customer=customer,
-                    loan_amount=row['Loan Amount'],
-                    tenure=row['Tenure'],
-                    interest_rate=row['Interest Rate'],
-                    monthly_repayment=row['Monthly payment'],  
-                    emis_paid_on_time=row['EMIs paid on Time'],
-                    start_date=start_date,
-                    end_date=end_date,
-                    loan_status=loan_status
-                )
-            )
-            
-
-            if loan_status == 'active':
-                with transaction.atomic():
-                    customer.current_debt += int(row['Loan Amount'])
-                    customer.save()
-                    
-        except Customer.DoesNotExist:
-            print(f"Customer with ID {row['Customer ID']} not found for loan {row['Loan ID']}")
+    known_customers = set(Customer.objects.values_list('customer_id', flat=True).iterator())
+    current_date = datetime.now().date()
+    loans = {}
+    for _, row in df.iterrows():
+        loan_id = int(row['Loan ID'])
+        customer_id = int(row['Customer ID'])
+        if loan_id in loans:
+            continue
+        if customer_id not in known_customers:
+            print(f"Customer with ID {customer_id} not found for loan {loan_id}")
             continue
-        
-    with transaction.atomic():
-        Loan.objects.bulk_create(loans_to_create, ignore_conflicts=True)
-    print("Loan data ingestion complete.")
\ No newline at end of file
+
+        start_date = pd.to_datetime(row['Date of Approval']).date()
+        end_date = pd.to_datetime(row['End Date']).date()
+
+        loan_status = 'active'
+        if end_date < current_date:
+            if row['EMIs paid on Time'] == row['Tenure']:
+                loan_status = 'paid'
+            else:
+                loan_status = 'default'
+
+        loans[loan_id] = Loan(
+            loan_id=loan_id,
+            customer_id=customer_id,
+            loan_amount=int(row['Loan Amount']),
+            tenure=int(row['Tenure']),
+            interest_rate=row['Interest Rate'],
+            monthly_repayment=int(row['Monthly payment']),
+            emis_paid_on_time=int(row['EMIs paid on Time']),
+            start_date=start_date,
+            end_date=end_date,
+            loan_status=loan_status
+        )
+
+    changed, hashes = changed_rows('loan', loans, LOAN_FIELDS, full=full)
+
+    # The stored version of a changed loan is what the score deltas subtract.
+    previous_states = {}
+    changed_ids = [loan.loan_id for loan in changed]
+    for start in range(0, len(changed_ids), INGEST_CHUNK_SIZE):
+        for row in Loan.objects.filter(
+            loan_id__in=changed_ids[start:start + INGEST_CHUNK_SIZE]
+        ).values('loan_id', *LOAN_STATE_FIELDS):
+            previous_states[row.pop('loan_id')] = row
+
+    def update_derived(chunk):
+        # A changed loan may have moved between customers; both need their
+        # debt and score updated.
+        affected_customers = {loan.customer_id for loan in chunk}
+        affected_customers.update(
+            previous_states[loan.loan_id]['customer_id'] for loan in chunk if loan.loan_id in previous_states
+        )
+        recompute_current_debt(affected_customers, INGEST_CHUNK_SIZE)
+        update_snapshots(
+            affected_customers, 'ingest',
+            [(previous_states.get(loan.loan_id), loan_state(loan)) for loan in chunk],
+        )
+
+    upsert_rows(
+        'loan', Loan, changed, hashes, LOAN_FIELDS, INGEST_CHUNK_SIZE,
+        on_chunk=lambda done, total: report_progress(self, done, total),
+        after_write=update_derived,
+    )
+    print(f"Loan data ingestion complete: {len(changed)} of {len(df)} rows new or changed.")
+    return {'processed': len(df), 'changed': len(changed)}
+
+
+@shared_task
+def roll_forward_loan_statuses_task():
+    """Moves active loans past their end date to 'paid' or 'default', using
+    the same rule as the loan ingest, and updates debt and scores. Then
+    checks every snapshot against a full recompute to catch drift."""
+    expired_loans = Loan.objects.filter(loan_status='active', end_date__lt=date.today())
+    expired = list(expired_loans)
+    if expired:
+        changes = []
+        for loan in expired:
+            old_state = loan_state(loan)
+            loan.loan_status = 'paid' if loan.emis_paid_on_time == loan.tenure else 'default'
+            changes.append((old_state, loan_state(loan)))
+        customer_ids = {loan.customer_id for loan in expired}
+
+        with transaction.atomic():
+            expired_loans.filter(emis_paid_on_time=F('tenure')).update(loan_status='paid')
+            expired_loans.exclude(emis_paid_on_time=F('tenure')).update(loan_status='default')
+            recompute_current_debt(customer_ids, INGEST_CHUNK_SIZE)
+            update_snapshots(customer_ids, 'status_change', changes)
+        print(f"Rolled forward {len(expired)} expired loans.")
+
+    reconciled = reconcile_snapshots()
+    return {'updated': len(expired), 'reconciled': len(reconciled)}
+
+
+@shared_task
+def build_loan_book_task(path=None):
+    """Rebuilds the loan book snapshot that batch scoring maps."""
+    from .loanbook import LoanBook
+
+    loan_book = LoanBook.build()
+    loan_book.save(path or settings.LOAN_BOOK_PATH)
+    print(f"Loan book built: {len(loan_book.customers)} customer slots, {len(loan_book.loans)} loans.")
+    return {'customers': len(loan_book.customers), 'loans': len(loan_book.loans)}
@@ -1,3 +1,619 @@
-from django.test import TestCase
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import date
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import Sum
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+from . import middleware, routers
+
+from .benchmarks.results import compare_results, percentile, summarize
+from .benchmarks.synthetic import CUSTOMER_COLUMNS, LOAN_COLUMNS, generate_dataset, load_into_db, write_xlsx
+from .ingest import recompute_current_debt
+from .models import CreditScoreSnapshot, Customer, IngestManifest, Loan
+from .querycount import QueryBudgetExceeded, query_budget, query_shape, record_queries
+from .scoring import compute_components, update_snapshots
+from .tasks import (
+    build_loan_book_task, ingest_customer_data_task, ingest_loan_data_task, roll_forward_loan_statuses_task
+)
+from .utils import add_months
+from .views import calculate_credit_score, calculate_credit_scores
+
+
+def create_customer_with_loans(loan_count=3):
+    customer = Customer.objects.create(
+        first_name='Alice',
+        last_name='Smith',
+        phone_number='9876511111',
+        monthly_salary=100000,
+        approved_limit=3600000,
+        current_debt=0,
+    )
+    for _ in range(loan_count):
+        Loan.objects.create(
+            customer=customer,
+            loan_amount=100000,
+            tenure=12,
+            interest_rate='10.00',
+            monthly_repayment=8792,
+            emis_paid_on_time=12,
+            start_date=date(2020, 1, 1),
+            end_date=date(2021, 1, 1),
+            loan_status='paid',
+        )
+    return customer
+
+
+class BenchmarkResultsTests(SimpleTestCase):
+    def report(self, **metrics):
+        return {'results': {'endpoints': {'view_loan': metrics}}}
+
+    def test_summarize(self):
+        self.assertEqual(percentile([], 0.5), 0.0)
+        stats = summarize([5, 1, 4, 2, 3])
+        self.assertEqual((stats['count'], stats['min'], stats['p50'], stats['max'], stats['mean']), (5, 1, 3, 5, 3))
+        self.assertEqual(summarize([])['p95'], 0.0)
+
+    def test_timings_get_a_relative_tolerance(self):
+        baseline = self.report(latency_ms={'p50': 10.0, 'p95': 20.0})
+        self.assertEqual(compare_results(baseline, self.report(latency_ms={'p50': 12.5, 'p95': 5.0})), [])
+        regressions = compare_results(baseline, self.report(latency_ms={'p50': 12.6, 'p95': 20.0}))
+        self.assertEqual(regressions, ['endpoints.view_loan.latency_ms.p50: 10.0 -> 12.6 (limit 12.5)'])
+        self.assertEqual(compare_results(
+            baseline, self.report(latency_ms={'p50': 12.6, 'p95': 20.0}), max_slowdown=0.5
+        ), [])
+
+    def test_throughput_may_not_drop(self):
+        baseline = {'results': {'load': {'throughput_rps': 100.0}}}
+        self.assertEqual(compare_results(baseline, {'results': {'load': {'throughput_rps': 75.0}}}), [])
+        self.assertEqual(len(compare_results(baseline, {'results': {'load': {'throughput_rps': 74.9}}})), 1)
+        self.assertEqual(compare_results(baseline, {'results': {'load': {'throughput_rps': 500.0}}}), [])
+
+    def test_query_and_error_counts_are_gated_exactly(self):
+        baseline = self.report(queries={'max': 2}, errors=0)
+        self.assertEqual(compare_results(baseline, self.report(queries={'max': 1}, errors=0)), [])
+        self.assertEqual(
+            compare_results(baseline, self.report(queries={'max': 3}, errors=1)),
+            ['endpoints.view_loan.errors: 0 -> 1 (limit 0)', 'endpoints.view_loan.queries.max: 2 -> 3 (limit 2)'],
+        )
+
+    def test_metrics_missing_from_either_run_are_skipped(self):
+        baseline = self.report(queries={'max': 2}, rss_kib={'p50': 1000})
+        self.assertEqual(compare_results(baseline, self.report(queries={'max': 2}, errors=3)), [])
+        self.assertEqual(compare_results({}, self.report(errors=3)), [])
+
+
+class SyntheticDatasetTests(TestCase):
+    def test_dataset_is_deterministic_and_loads(self):
+        customers, loans = generate_dataset(20, 50, seed=7)
+        self.assertEqual((customers, loans), generate_dataset(20, 50, seed=7))
+        self.assertNotEqual(customers, generate_dataset(20, 50, seed=8)[0])
+        self.assertEqual(len({row['Phone Number'] for row in customers}), 20)
+        self.assertTrue({row['Customer ID'] for row in loans} <= {row['Customer ID'] for row in customers})
+
+        load_into_db(customers, loans)
+        self.assertEqual((Customer.objects.count(), Loan.objects.count()), (20, 50))
+        active = Loan.objects.filter(loan_status='active').aggregate(total=Sum('loan_amount'))['total'] or 0
+        self.assertEqual(Customer.objects.aggregate(total=Sum('current_debt'))['total'], active)
+
+
+class QueryBudgetTests(TransactionTestCase):
+    """Runs every endpoint against the budgets in settings.QUERY_INSPECTION.
+
+    TransactionTestCase keeps the counts free of test-only savepoints.
+    """
+    # Requests may read from any replica configured through DB_REPLICAS.
+    databases = '__all__'
+
+    def setUp(self):
+        self.client = Client()
+        self.customer = create_customer_with_loans()
+        self.loan = Loan.objects.filter(customer=self.customer).first()
+        # Budgets are for the steady state, where the score is already stored.
+        update_snapshots([self.customer.customer_id], 'backfill')
+        self.loan_request = {
+            'customer_id': self.customer.customer_id,
+            'loan_amount': 100000,
+            'interest_rate': 14,
+            'tenure': 12,
+        }
+
+    def test_register_customer(self):
+        with query_budget('register_customer'):
+            response = self.client.post('/register', {
+                'first_name': 'Bob',
+                'last_name': 'Jones',
+                'age': 30,
+                'monthly_income': 50000,
+                'phone_number': '9876522222',
+            }, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_check_eligibility(self):
+        with query_budget('check_eligibility'):
+            response = self.client.post('/check-eligibility', self.loan_request, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_create_loan(self):
+        with query_budget('create_loan'):
+            response = self.client.post('/create-loan', self.loan_request, content_type='application/json')
+        self.assertTrue(response.json()['loan_approved'])
+
+    def test_view_loan_detail(self):
+        with query_budget('view_loan_detail'):
+            response = self.client.get(f'/view-loan/{self.loan.loan_id}')
+        self.assertEqual(response.status_code, 200)
+
+    def test_view_customer_loans(self):
+        with query_budget('view_customer_loans'):
+            response = self.client.get(f'/view-loans/{self.customer.customer_id}')
+        self.assertEqual(len(response.json()), 3)
+
+    def test_search_customers(self):
+        with query_budget('search_customers'):
+            response = self.client.get('/search-customers?q=smi')
+        self.assertEqual(len(response.json()['results']), 1)
+
+
+class QueryInspectionTests(TransactionTestCase):
+    # Requests read from the replicas configured through DB_REPLICAS, which
+    # only see committed data, hence TransactionTestCase.
+    databases = '__all__'
+
+    def test_query_shape_collapses_in_lists(self):
+        self.assertEqual(
+            query_shape('SELECT  *\n FROM t WHERE id IN (%s, %s, %s)'),
+            'SELECT * FROM t WHERE id IN (...)',
+        )
+
+    def test_duplicate_shapes_are_flagged(self):
+        customer = create_customer_with_loans()
+        with record_queries() as log:
+            for loan in Loan.objects.filter(customer=customer):
+                loan.customer.first_name
+        self.assertEqual(log.count, 4)
+        [(shape, count)] = log.duplicates()
+        self.assertEqual(count, 3)
+        self.assertIn('credit_app_customer', shape)
+
+    def test_budget_overrun_fails(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            with query_budget('customers', budget=1):
+                Customer.objects.count()
+                Customer.objects.count()
+
+    def test_duplicates_can_fail_the_budget(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            with query_budget('customers', budget=5, allow_duplicates=False):
+                Customer.objects.count()
+                Customer.objects.count()
+
+    @override_settings(QUERY_INSPECTION={'ENABLED': True, 'SERVER_TIMING': True})
+    def test_middleware_adds_server_timing(self):
+        customer = create_customer_with_loans()
+        response = Client().get(f'/view-loans/{customer.customer_id}')
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[0-9.]+;desc="2 queries"$')
+
+    @override_settings(QUERY_INSPECTION={'ENABLED': False})
+    def test_middleware_can_be_disabled(self):
+        customer = create_customer_with_loans()
+        response = Client().get(f'/view-loans/{customer.customer_id}')
+        self.assertFalse(response.has_header('Server-Timing'))
+
+
+class AddMonthsTests(TestCase):
+    def test_add_months(self):
+        self.assertEqual(add_months(date(2024, 3, 15), 12), date(2025, 3, 15))
+        self.assertEqual(add_months(date(2024, 11, 30), 3), date(2025, 2, 28))
+        self.assertEqual(add_months(date(2024, 1, 31), 1), date(2024, 2, 29))
+
+
+class LeanImportTests(TestCase):
+    def test_web_and_worker_modules_do_not_import_pandas(self):
+        script = (
+            'import sys, django\n'
+            'django.setup()\n'
+            'import credit_approval_system.urls, credit_app.tasks\n'
+            'print(sorted({"pandas", "openpyxl", "numpy"} & set(sys.modules)))\n'
+        )
+        output = subprocess.run(
+            [sys.executable, '-c', script], check=True, capture_output=True, text=True
+        ).stdout
+        self.assertEqual(output.strip(), '[]')
+
+
+class TaskRoutingTests(TestCase):
+    def route(self, task_name):
+        return ingest_loan_data_task.app.amqp.router.route({}, task_name)['queue']
+
+    def test_ingestion_has_its_own_queue(self):
+        for task in (ingest_customer_data_task, ingest_loan_data_task):
+            queue = self.route(task.name)
+            self.assertEqual((queue.name, queue.routing_key), ('ingestion', 'ingestion'))
+            self.assertTrue(task.acks_late)
+
+    def test_other_tasks_default_to_scoring(self):
+        queue = self.route('credit_app.tasks.score_customer')
+        self.assertEqual((queue.name, queue.routing_key), ('scoring', 'scoring'))
+        self.assertEqual(self.route('credit_approval_system.celery.debug_task').name, 'maintenance')
+
+
+class IncrementalIngestTests(TestCase):
+    def setUp(self):
+        workdir = tempfile.TemporaryDirectory()
+        self.addCleanup(workdir.cleanup)
+        self.customer_file = os.path.join(workdir.name, 'customer_data.xlsx')
+        self.loan_file = os.path.join(workdir.name, 'loan_data.xlsx')
+        self.customers = [
+            {'Customer ID': 1, 'First Name': 'Aaron', 'Last Name': 'Das', 'Age': 30,
+             'Phone Number': 9100000001, 'Monthly Salary': 50000, 'Approved Limit': 1800000},
+            {'Customer ID': 2, 'First Name': 'Abbey', 'Last Name': 'Rao', 'Age': 40,
+             'Phone Number': 9100000002, 'Monthly Salary': 80000, 'Approved Limit': 2900000},
+        ]
+        self.loans = [
+            self.loan_row(1001, 1, 200000, end_date=date(2099, 1, 1)),
+            self.loan_row(1002, 1, 300000, end_date=date(2099, 1, 1)),
+            self.loan_row(1003, 2, 400000, end_date=date(2015, 1, 1)),
+        ]
+
+    def loan_row(self, loan_id, customer_id, amount, end_date):
+        return {
+            'Customer ID': customer_id, 'Loan ID': loan_id, 'Loan Amount': amount,
+            'Tenure': 12, 'Interest Rate': 10.5, 'Monthly payment': 9000,
+            'EMIs paid on Time': 12, 'Date of Approval': date(2014, 1, 1), 'End Date': end_date,
+        }
+
+    def ingest(self):
+        write_xlsx(self.customers, CUSTOMER_COLUMNS, self.customer_file)
+        write_xlsx(self.loans, LOAN_COLUMNS, self.loan_file)
+        return ingest_customer_data_task(self.customer_file), ingest_loan_data_task(self.loan_file)
+
+    def test_rerun_writes_nothing_and_does_not_double_count_debt(self):
+        customers, loans = self.ingest()
+        self.assertEqual((customers['changed'], loans['changed']), (2, 3))
+        self.assertEqual(Customer.objects.get(pk=1).current_debt, 500000)
+        self.assertEqual(IngestManifest.objects.count(), 5)
+
+        customers, loans = self.ingest()
+        self.assertEqual((customers['changed'], loans['changed']), (0, 0))
+        self.assertEqual(Customer.objects.get(pk=1).current_debt, 500000)
+
+    def test_changed_rows_are_updated(self):
+        self.ingest()
+        self.customers[1]['Monthly Salary'] = 90000
+        self.loans[1] = self.loan_row(1002, 2, 300000, end_date=date(2099, 1, 1))
+
+        customers, loans = self.ingest()
+        self.assertEqual((customers['changed'], loans['changed']), (1, 1))
+        self.assertEqual(Customer.objects.get(pk=2).monthly_salary, 90000)
+        self.assertEqual(Loan.objects.get(pk=1002).customer_id, 2)
+        self.assertEqual(Customer.objects.get(pk=1).current_debt, 200000)
+        self.assertEqual(Customer.objects.get(pk=2).current_debt, 300000)
+
+    def test_ingest_writes_score_snapshots_only_for_changes(self):
+        self.ingest()
+        self.assertEqual(CreditScoreSnapshot.objects.filter(reason='ingest').count(), 2)
+        self.ingest()
+        self.assertEqual(CreditScoreSnapshot.objects.count(), 2)
+
+        self.loans[0] = self.loan_row(1001, 1, 200000, end_date=date(2015, 1, 1))
+        self.ingest()
+        snapshot = CreditScoreSnapshot.objects.filter(customer_id=1).latest('id')
+        self.assertEqual(snapshot.active_principal, 300000)
+        self.assertEqual(snapshot.current_debt, 300000)
+
+    def test_rerun_after_a_failed_chunk_completes_derived_state(self):
+        from . import tasks
+
+        self.ingest()
+        Loan.objects.all().delete()
+        CreditScoreSnapshot.objects.all().delete()
+        IngestManifest.objects.filter(source='loan').delete()
+        Customer.objects.update(current_debt=0)
+
+        calls = []
+
+        def fail_on_second_chunk(customer_ids, chunk_size):
+            calls.append(customer_ids)
+            if len(calls) == 2:
+                raise RuntimeError('worker lost')
+            return recompute_current_debt(customer_ids, chunk_size)
+
+        with mock.patch.object(tasks, 'INGEST_CHUNK_SIZE', 1), \
+                mock.patch.object(tasks, 'recompute_current_debt', fail_on_second_chunk), \
+                self.assertRaises(RuntimeError):
+            ingest_loan_data_task(self.loan_file)
+        # The first chunk committed with its debt, snapshot and manifest entry.
+        self.assertEqual(Customer.objects.get(pk=1).current_debt, 200000)
+        self.assertEqual(IngestManifest.objects.filter(source='loan').count(), 1)
+
+        self.assertEqual(ingest_loan_data_task(self.loan_file)['changed'], 2)
+        self.assertEqual(Customer.objects.get(pk=1).current_debt, 500000)
+        snapshot = CreditScoreSnapshot.objects.filter(customer_id=1).latest('id')
+        self.assertEqual((snapshot.total_loans, snapshot.current_debt), (2, 500000))
+
+    def test_full_rewrites_every_row(self):
+        self.ingest()
+        result = ingest_loan_data_task(self.loan_file, full=True)
+        self.assertEqual(result['changed'], 3)
+
+
+@override_settings(DATABASE_REPLICATION={'REPLICAS': ['replica1', 'replica2'], 'MAX_LAG': 5, 'CHECK_INTERVAL': 60})
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+        routers._health.clear()
+        self.addCleanup(routers._health.clear)
+        patcher = mock.patch.object(routers, 'replica_lag', return_value=0)
+        self.replica_lag = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.token = routers.start_request()
+        self.addCleanup(lambda: routers.end_request(self.token))
+
+    def test_reads_outside_a_request_use_the_primary(self):
+        routers.end_request(self.token)
+        self.assertEqual(self.router.db_for_read(Loan), 'default')
+        self.token = routers.start_request()
+
+    def test_reads_go_to_a_replica(self):
+        self.assertIn(self.router.db_for_read(Loan), ['replica1', 'replica2'])
+        self.assertEqual(self.router.db_for_write(Loan), 'default')
+
+    def test_write_pins_the_rest_of_the_request(self):
+        self.router.db_for_write(Loan)
+        self.assertEqual(self.router.db_for_read(Loan), 'default')
+
+    def test_lagging_or_unreachable_replicas_are_skipped(self):
+        def replica_lag(alias):
+            if alias == 'replica2':
+                raise DatabaseError('connection refused')
+            return 30
+
+        self.replica_lag.side_effect = replica_lag
+        self.assertEqual(self.router.db_for_read(Loan), 'default')
+
+    def test_lag_is_checked_once_per_interval(self):
+        for _ in range(5):
+            self.router.db_for_read(Loan)
+        self.assertEqual(self.replica_lag.call_count, 2)
+
+    def test_migrations_only_run_on_the_primary(self):
+        self.assertTrue(self.router.allow_migrate('default', 'credit_app'))
+        self.assertFalse(self.router.allow_migrate('replica1', 'credit_app'))
+
+
+@skipUnless(settings.DATABASE_REPLICATION['REPLICAS'], 'set DB_REPLICAS to run against a replica')
+class ReplicaRoutingTests(TransactionTestCase):
+    """Runs only with DB_REPLICAS set, e.g. DB_REPLICAS=db_replica.sqlite3.
+
+    The replica is a separate connection to the test database (a TEST
+    MIRROR), so it only sees committed data.
+    """
+    databases = '__all__'
+
+    def setUp(self):
+        self.customer = create_customer_with_loans()
+        routers._health.clear()
+
+    def aliases(self, response_fn):
+        with record_queries() as log:
+            response = response_fn()
+        return response, {query.alias for query in log.queries}
+
+    def test_reads_use_a_replica(self):
+        _, aliases = self.aliases(lambda: self.client.get(f'/view-loans/{self.customer.customer_id}'))
+        self.assertTrue(aliases)
+        self.assertLessEqual(aliases, set(settings.DATABASE_REPLICATION['REPLICAS']))
+
+    def test_create_loan_reads_its_own_writes(self):
+        response, aliases = self.aliases(lambda: self.client.post('/create-loan', {
+            'customer_id': self.customer.customer_id, 'loan_amount': 100000, 'interest_rate': 14, 'tenure': 12,
+        }, content_type='application/json'))
+        self.assertEqual(aliases, {'default'})
+        self.assertIn(middleware.PIN_COOKIE, response.cookies)
+
+        _, aliases = self.aliases(lambda: self.client.get(f"/view-loan/{response.json()['loan_id']}"))
+        self.assertEqual(aliases, {'default'})
+
+
+class CustomerSearchTests(TransactionTestCase):
+    # Requests read from the replicas configured through DB_REPLICAS, which
+    # only see committed data, hence TransactionTestCase.
+    databases = '__all__'
+
+    def setUp(self):
+        names = [('Alice', 'Smith'), ('Alicia', 'Jones'), ('Bob', 'Smithers'), ('Carol', 'Das')]
+        for index, (first_name, last_name) in enumerate(names):
+            Customer.objects.create(
+                first_name=first_name, last_name=last_name, phone_number=f'98765{index:05d}',
+                monthly_salary=100000, approved_limit=3600000, current_debt=0,
+            )
+        self.alice = Customer.objects.get(first_name='Alice')
+        Loan.objects.create(
+            customer=self.alice, loan_amount=100000, tenure=12, interest_rate='10.00',
+            monthly_repayment=8792, start_date=date(2024, 1, 1), end_date=date(2099, 1, 1),
+        )
+
+    def search(self, **params):
+        response = self.client.get('/search-customers', params)
+        return response.status_code, response.json()
+
+    def test_search_by_name(self):
+        _, body = self.search(q='smith')
+        self.assertEqual([hit['last_name'] for hit in body['results']], ['Smith', 'Smithers'])
+        _, body = self.search(q='ali smi')
+        self.assertEqual([hit['first_name'] for hit in body['results']], ['Alice'])
+
+    def test_search_by_phone_prefix(self):
+        _, body = self.search(q='9876500002')
+        self.assertEqual([hit['first_name'] for hit in body['results']], ['Bob'])
+        _, body = self.search(q='98765')
+        self.assertEqual(len(body['results']), 4)
+
+    def test_results_include_exposure(self):
+        _, body = self.search(q='smith')
+        self.assertEqual(body['results'][0]['exposure'], {
+            'active_loans': 1,
+            'active_principal': '100000.00',
+            'monthly_installments': '8792.00',
+            'current_debt': '0.00',
+            'approved_limit': '3600000.00',
+        })
+        self.assertEqual(body['results'][1]['exposure']['active_loans'], 0)
+
+    def test_keyset_pagination(self):
+        _, first = self.search(q='98765', limit=3)
+        self.assertEqual(len(first['results']), 3)
+        _, second = self.search(q='98765', limit=3, cursor=first['next_cursor'])
+        self.assertEqual([hit['first_name'] for hit in second['results']], ['Carol'])
+        self.assertIsNone(second['next_cursor'])
+
+    def test_short_queries_are_rejected(self):
+        status_code, _ = self.search(q='al')
+        self.assertEqual(status_code, 400)
+
+
+class CreditScoreSnapshotTests(TransactionTestCase):
+    # Requests read from the replicas configured through DB_REPLICAS, which
+    # only see committed data, hence TransactionTestCase.
+    databases = '__all__'
+
+    def setUp(self):
+        self.customer = create_customer_with_loans()
+        self.components = ['total_loans', 'on_time_loans', 'approved_amount', 'active_principal', 'active_loans_current_year']
+
+    def assert_matches_full_recompute(self, snapshot):
+        expected = compute_components([self.customer.customer_id], date.today().year)[self.customer.customer_id]
+        self.assertEqual({name: getattr(snapshot, name) for name in self.components}, expected)
+
+    def test_first_request_backfills_and_later_ones_read_the_snapshot(self):
+        self.assertEqual(calculate_credit_score(self.customer.customer_id), 55)
+        with record_queries() as log:
+            self.assertEqual(calculate_credit_score(self.customer.customer_id), 55)
+        self.assertEqual(log.count, 1)
+        self.assertEqual(CreditScoreSnapshot.objects.get().reason, 'backfill')
+
+    def test_create_loan_moves_the_snapshot_forward(self):
+        calculate_credit_score(self.customer.customer_id)
+        response = self.client.post('/create-loan', {
+            'customer_id': self.customer.customer_id, 'loan_amount': 100000, 'interest_rate': 14, 'tenure': 12,
+        }, content_type='application/json')
+        self.assertTrue(response.json()['loan_approved'])
+
+        snapshot = CreditScoreSnapshot.objects.latest('id')
+        self.assertEqual(snapshot.reason, 'loan_created')
+        self.assertEqual((snapshot.total_loans, snapshot.active_loans_current_year), (4, 1))
+        self.assertEqual(snapshot.current_debt, 100000)
+        self.assert_matches_full_recompute(snapshot)
+
+    def test_status_roll_forward(self):
+        loan = Loan.objects.filter(customer=self.customer).first()
+        Loan.objects.filter(pk=loan.pk).update(loan_status='active', emis_paid_on_time=6)
+        Customer.objects.filter(pk=self.customer.pk).update(current_debt=100000)
+        calculate_credit_score(self.customer.customer_id)
+
+        self.assertEqual(roll_forward_loan_statuses_task(), {'updated': 1, 'reconciled': 0})
+        self.assertEqual(Loan.objects.get(pk=loan.pk).loan_status, 'default')
+        snapshot = CreditScoreSnapshot.objects.latest('id')
+        self.assertEqual((snapshot.reason, snapshot.current_debt, snapshot.active_principal), ('status_change', 0, 0))
+        self.assert_matches_full_recompute(snapshot)
+
+    def test_daily_task_reconciles_drifted_snapshots(self):
+        calculate_credit_score(self.customer.customer_id)
+        # A loan written without its delta, as a lost concurrent update would leave it.
+        Loan.objects.create(
+            customer=self.customer, loan_amount=100000, tenure=12, interest_rate='10.00',
+            monthly_repayment=8792, emis_paid_on_time=0, start_date=date.today(),
+            end_date=add_months(date.today(), 12), loan_status='active',
+        )
+
+        self.assertEqual(roll_forward_loan_statuses_task(), {'updated': 0, 'reconciled': 1})
+        snapshot = CreditScoreSnapshot.objects.latest('id')
+        self.assertEqual(snapshot.reason, 'reconcile')
+        self.assert_matches_full_recompute(snapshot)
+        self.assertEqual(roll_forward_loan_statuses_task(), {'updated': 0, 'reconciled': 0})
+
+    def test_year_rollover_is_recorded(self):
+        calculate_credit_score(self.customer.customer_id)
+        CreditScoreSnapshot.objects.update(year=date.today().year - 1)
+        calculate_credit_score(self.customer.customer_id)
+        self.assertEqual(CreditScoreSnapshot.objects.latest('id').reason, 'year_rollover')
+
+    def test_history_endpoint(self):
+        calculate_credit_score(self.customer.customer_id)
+        self.client.post('/create-loan', {
+            'customer_id': self.customer.customer_id, 'loan_amount': 100000, 'interest_rate': 14, 'tenure': 12,
+        }, content_type='application/json')
+
+        with query_budget('credit_score_history'):
+            response = self.client.get(f'/credit-score-history/{self.customer.customer_id}')
+        self.assertEqual([entry['reason'] for entry in response.json()], ['backfill', 'loan_created'])
+        self.assertEqual(self.client.get('/credit-score-history/999').status_code, 404)
+
+
+class LoanBookTests(TestCase):
+    def setUp(self):
+        self.customer = create_customer_with_loans()
+        Loan.objects.create(
+            customer=self.customer, loan_amount=300000, tenure=24, interest_rate='12.00',
+            monthly_repayment=14122, emis_paid_on_time=3, start_date=date.today(),
+            end_date=add_months(date.today(), 24), loan_status='active',
+        )
+        # A gap in the ids, and a customer whose debt exceeds the limit.
+        self.gap_id = self.customer.customer_id + 1
+        self.indebted = Customer.objects.create(
+            customer_id=self.customer.customer_id + 2, first_name='Bob', last_name='Jones',
+            phone_number='9876522222', monthly_salary=50000, approved_limit=1800000, current_debt=2000000,
+        )
+        self.path = os.path.join(tempfile.mkdtemp(), 'loan_book.bin')
+        self.addCleanup(lambda: os.path.exists(self.path) and os.unlink(self.path))
+
+    def test_round_trip_through_a_shared_mapping(self):
+        from .loanbook import LoanBook, get_loan_book
+        import numpy as np
+
+        self.assertEqual(build_loan_book_task(self.path), {'customers': 3, 'loans': 4})
+        loan_book = get_loan_book(self.path)
+        self.assertIsInstance(loan_book.customers, np.memmap)
+        self.assertFalse(loan_book.customers.flags.writeable)
+        self.assertIs(get_loan_book(self.path), loan_book)
+
+        self.assertEqual(loan_book.offsets([self.customer.customer_id, self.gap_id, 10 ** 6]).tolist(), [0, -1, -1])
+        self.assertEqual(len(loan_book.customer_loans(self.customer.customer_id)), 4)
+        self.assertEqual(len(loan_book.customer_loans(self.indebted.customer_id)), 0)
+        self.assertEqual(LoanBook.load(self.path).loans.tobytes(), LoanBook.build().loans.tobytes())
+
+    def test_components_match_the_database(self):
+        from .loanbook import LoanBook
+
+        loan_book = LoanBook.build()
+        year = date.today().year
+        ids = [self.customer.customer_id, self.indebted.customer_id]
+        expected = compute_components(ids, year)
+        for customer_id, offset in zip(ids, loan_book.offsets(ids)):
+            record = loan_book.customers[offset]
+            self.assertEqual({name: int(record[name]) for name in expected[customer_id]}, expected[customer_id])
+
+        previous_year = loan_book.for_year(year - 1)
+        self.assertEqual(previous_year.customers['active_loans_current_year'][0], 0)
+        self.assertEqual(loan_book.customers['active_loans_current_year'][0], 1)
+
+    def test_batch_scores_match_single_scores(self):
+        from .loanbook import LoanBook
+
+        LoanBook.build().save(self.path)
+        with self.settings(LOAN_BOOK_PATH=self.path), record_queries() as log:
+            scores = calculate_credit_scores([self.customer.customer_id, self.gap_id, self.indebted.customer_id])
+        self.assertEqual(log.count, 0)
+        self.assertEqual(scores, {
+            self.customer.customer_id: calculate_credit_score(self.customer.customer_id),
+            self.gap_id: 0,
+            self.indebted.customer_id: calculate_credit_score(self.indebted.customer_id),
+        })
+        self.assertEqual(scores[self.indebted.customer_id], 0)
+        self.assertGreater(scores[self.customer.customer_id], 0)
@@ -4,7 +4,9 @@ from .views import (
     CheckEligibilityView,
     CreateLoanView,
     ViewLoanDetailView,
-    ViewCustomerLoansView
+    ViewCustomerLoansView,
+    CustomerSearchView,
+    CreditScoreHistoryView
 )
 
 urlpatterns = [
@@ -13,4 +15,6 @@ urlpatterns = [
     path('create-loan', CreateLoanView.as_view(), name='create_loan'),
     path('view-loan/<int:loan_id>', ViewLoanDetailView.as_view(), name='view_loan_detail'),
     path('view-loans/<int:customer_id>', ViewCustomerLoansView.as_view(), name='view_customer_loans'),
+    path('search-customers', CustomerSearchView.as_view(), name='search_customers'),
+    path('credit-score-history/<int:customer_id>', CreditScoreHistoryView.as_view(), name='credit_score_history'),
 ]
\ No newline at end of file
@@ -0,0 +1,12 @@
+import calendar
+from datetime import date
+
+
+def add_months(start, months):
+    """Adds calendar months to a date, clamping the day to the end of the
+    target month (31 Jan + 1 month -> 28/29 Feb), like pandas' DateOffset."""
+    month_index = start.month - 1 + months
+    year = start.year + month_index // 12
+    month = month_index % 12 + 1
+    day = min(start.day, calendar.monthrange(year, month)[1])
+    return date(year, month, day)
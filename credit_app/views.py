@@ -2,19 +2,25 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from django.db import transaction
-from django.db.models import Sum, Count, F 
+from django.db.models import Sum, Count, F, Q 
+import logging
 from datetime import date
 from decimal import Decimal, ROUND_HALF_UP
-import pandas as pd 
 
-from .models import Customer, Loan
+from .models import Customer, Loan, CreditScoreSnapshot
+from .scoring import COMPONENTS, latest_snapshot, loan_state, score_from_components, update_snapshots
+from .utils import add_months
 from .serializers import (
     RegisterCustomerSerializer, RegisterCustomerResponseSerializer,
     CheckEligibilityRequestSerializer, CheckEligibilityResponseSerializer,
     CreateLoanRequestSerializer, CreateLoanResponseSerializer,
-    ViewLoanDetailResponseSerializer, LoanListItemSerializer
+    ViewLoanDetailResponseSerializer, LoanListItemSerializer,
+    CustomerSearchRequestSerializer, CustomerSearchResultSerializer,
+    CreditScoreSnapshotSerializer
 )
 
+logger = logging.getLogger(__name__)
+
 def calculate_emi(principal, annual_interest_rate, tenure_months):
     """Calculates EMI using compound interest formula."""
     if annual_interest_rate == 0:
@@ -33,64 +39,47 @@ def calculate_emi(principal, annual_interest_rate, tenure_months):
     return emi.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP) 
 
 def calculate_credit_score(customer_id):
-    """Calculates credit score based on historical loan data."""
-    try:
-        customer = Customer.objects.get(customer_id=customer_id)
-    except Customer.DoesNotExist:
-        print(f"DEBUG: Customer {customer_id} not found for credit score calculation.")
-        return 0 # Or raise an error
-
-    loans = Loan.objects.filter(customer=customer)
-    print(f"DEBUG: Customer {customer_id} - Total loans fetched: {loans.count()}")
-
-    credit_score = 0
-
-   
-    on_time_loans = loans.filter(emis_paid_on_time__gte=F('tenure')).count()
-    print(f"DEBUG: Customer {customer_id} - On-time loans (count): {on_time_loans}")
-    if on_time_loans > 0:
-        credit_score += 20 # Example weight
-    print(f"DEBUG: Customer {customer_id} - Score after on-time: {credit_score}")
-
-   
-    total_loans = loans.count()
-    print(f"DEBUG: Customer {customer_id} - Total loans (count): {total_loans}")
-    if total_loans > 0:
-        credit_score += min(20, total_loans * 5) # Max 20 points for number of loans
-    print(f"DEBUG: Customer {customer_id} - Score after total loans: {credit_score}")
-
-    
-    current_year = date.today().year
-   
-    active_loans_current_year = loans.filter(
-        start_date__year=current_year,
-        loan_status='active'
-    ).count()
-    print(f"DEBUG: Customer {customer_id} - Active loans current year: {active_loans_current_year}")
-    if active_loans_current_year > 0:
-        credit_score += min(10, active_loans_current_year * 2)
-    print(f"DEBUG: Customer {customer_id} - Score after current year activity: {credit_score}")
-
-    
-    total_approved_amount = loans.aggregate(Sum('loan_amount'))['loan_amount__sum'] or Decimal('0.00')
-    print(f"DEBUG: Customer {customer_id} - Total approved amount: {total_approved_amount}")
-    if total_approved_amount > 0:
-        credit_score += min(20, int(total_approved_amount / 10000)) # Example: 1 point per 10k approved
-    print(f"DEBUG: Customer {customer_id} - Score after approved volume: {credit_score}")
-
-   
-    total_active_loan_principal = Loan.objects.filter(
-        customer=customer, loan_status='active'
-    ).aggregate(Sum('loan_amount'))['loan_amount__sum'] or Decimal('0.00')
-
-    
-    if (customer.current_debt + total_active_loan_principal) > customer.approved_limit:
-        credit_score = 0
-        print(f"DEBUG: Customer {customer_id} - Credit score set to 0 due to total active loans > approved limit.")
-
-    print(f"DEBUG: Customer {customer_id} - Final calculated credit score: {credit_score}")
-    
-    return max(0, min(100, credit_score))
+    """Returns the customer's latest credit score snapshot.
+
+    Snapshots are kept current by every write that changes the score's
+    inputs; one is only computed here for a customer who has none yet, or
+    whose latest snapshot is from a previous year.
+    """
+    snapshot = latest_snapshot(customer_id)
+    if snapshot is None or snapshot.year != date.today().year:
+        snapshot = update_snapshots([customer_id], 'backfill').get(customer_id)
+        if snapshot is None:
+            print(f"DEBUG: Customer {customer_id} not found for credit score calculation.")
+            return 0 # Or raise an error
+
+    logger.debug('Customer %s - credit score %s from snapshot %s (%s)', customer_id, snapshot.score, snapshot.id, snapshot.reason)
+    return snapshot.score
+
+def calculate_credit_scores(customer_ids, loan_book=None):
+    """Batch version of calculate_credit_score for scoring and simulation runs.
+
+    Scores come from a LoanBook snapshot (settings.LOAN_BOOK_PATH by
+    default) instead of the database, so they are as current as its last
+    rebuild. Returns {customer_id: score}; unknown customers score 0.
+    """
+    # numpy is only loaded by processes that batch score.
+    from .loanbook import get_loan_book
+
+    loan_book = (loan_book or get_loan_book()).for_year(date.today().year)
+    offsets = loan_book.offsets(customer_ids)
+    known = offsets >= 0
+    # Only the requested records are copied out of the mapping, a column at a time.
+    records = loan_book.customers[offsets[known]]
+    columns = {name: records[name].tolist() for name in COMPONENTS + ['current_debt', 'approved_limit']}
+
+    scores = dict.fromkeys(customer_ids, 0)
+    for row, customer_id in enumerate(customer_id for customer_id, found in zip(customer_ids, known.tolist()) if found):
+        components = {name: columns[name][row] for name in COMPONENTS}
+        scores[customer_id] = score_from_components(
+            components, columns['current_debt'][row], columns['approved_limit'][row]
+        )
+    logger.debug('Batch scored %d customers from loan book built %s', len(scores), loan_book.built_at)
+    return scores
 
 
 class RegisterCustomerView(APIView):
@@ -228,6 +217,10 @@ class CheckEligibilityView(APIView):
 
 
 class CreateLoanView(APIView):
+    # Eligibility and current_debt must be read from the primary, since the
+    # loan is written from them in the same request.
+    read_from_replica = False
+
     def post(self, request):
         serializer = CreateLoanRequestSerializer(data=request.data)
         if serializer.is_valid():
@@ -300,6 +293,9 @@ class CreateLoanView(APIView):
             if loan_approved:
                 monthly_installment = calculate_emi(loan_amount, final_interest_rate, tenure)
                 with transaction.atomic():
+                    # Lock the customer so concurrent loans for it update
+                    # current_debt and the score snapshot one at a time.
+                    customer = Customer.objects.select_for_update().get(customer_id=customer.customer_id)
                     loan = Loan.objects.create(
                         customer=customer,
                         loan_amount=loan_amount,
@@ -309,11 +305,12 @@ class CreateLoanView(APIView):
                         emis_paid_on_time=0, 
                         start_date=date.today(),
                 
-                        end_date=date.today() + pd.DateOffset(months=tenure)
+                        end_date=add_months(date.today(), tenure)
                     )
                     
                     customer.current_debt += loan_amount
                     customer.save()
+                    update_snapshots([customer.customer_id], 'loan_created', [(None, loan_state(loan))])
                     loan_id = loan.loan_id
                     if not message: 
                         message = "Loan approved successfully."
@@ -382,4 +379,73 @@ class ViewCustomerLoansView(APIView):
                 "repayments_left": repayments_left,
             })
         serializer = LoanListItemSerializer(loan_list, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+class CustomerSearchView(APIView):
+    """Finds customers by phone number prefix (all digits) or by name.
+
+    Results are ordered by customer_id and paginated by keyset: pass the
+    returned `next_cursor` as `cursor` to get the next page.
+    """
+    def get(self, request):
+        serializer = CustomerSearchRequestSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        query = serializer.validated_data['q'].strip()
+        limit = serializer.validated_data['limit']
+
+        customers = Customer.objects.all()
+        if query.isdigit():
+            customers = customers.filter(phone_number__startswith=query)
+        else:
+            # Every word has to match the first or last name.
+            for term in query.split():
+                customers = customers.filter(Q(first_name__icontains=term) | Q(last_name__icontains=term))
+        if 'cursor' in serializer.validated_data:
+            customers = customers.filter(customer_id__gt=serializer.validated_data['cursor'])
+
+        page = list(customers.order_by('customer_id')[:limit + 1])
+        next_cursor = page[limit - 1].customer_id if len(page) > limit else None
+        page = page[:limit]
+
+        exposures = {
+            row['customer_id']: row
+            for row in Loan.objects.filter(
+                customer_id__in=[customer.customer_id for customer in page], loan_status='active'
+            ).values('customer_id').annotate(
+                active_loans=Count('loan_id'),
+                active_principal=Sum('loan_amount'),
+                monthly_installments=Sum('monthly_repayment'),
+            )
+        }
+
+        results = []
+        for customer in page:
+            exposure = exposures.get(customer.customer_id, {})
+            results.append({
+                "customer_id": customer.customer_id,
+                "first_name": customer.first_name,
+                "last_name": customer.last_name,
+                "phone_number": customer.phone_number,
+                "exposure": {
+                    "active_loans": exposure.get('active_loans', 0),
+                    "active_principal": exposure.get('active_principal', 0),
+                    "monthly_installments": exposure.get('monthly_installments', 0),
+                    "current_debt": customer.current_debt,
+                    "approved_limit": customer.approved_limit,
+                },
+            })
+        return Response({
+            "results": CustomerSearchResultSerializer(results, many=True).data,
+            "next_cursor": next_cursor,
+        }, status=status.HTTP_200_OK)
+
+
+class CreditScoreHistoryView(APIView):
+    def get(self, request, customer_id):
+        if not Customer.objects.filter(customer_id=customer_id).exists():
+            return Response({"message": "Customer not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        snapshots = CreditScoreSnapshot.objects.filter(customer_id=customer_id).order_by('id')
+        serializer = CreditScoreSnapshotSerializer(snapshots, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
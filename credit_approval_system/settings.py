@@ -10,8 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
+from datetime import timedelta
 from pathlib import Path
 
+from kombu import Queue
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -42,6 +46,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "credit_app.middleware.QueryInspectionMiddleware",
+    "credit_app.middleware.PrimaryPinningMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -75,17 +81,44 @@ WSGI_APPLICATION = "credit_approval_system.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# The defaults match docker-compose.yml; override them to run locally, e.g.
+# DB_ENGINE=django.db.backends.sqlite3 DB_NAME=db.sqlite3 for the benchmarks.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql_psycopg2',
-        'NAME': 'postgres',
-        'USER': 'postgres',
-        'PASSWORD': 'password',
-        'HOST': 'db', # Service name in docker-compose.yml
-        'PORT': '5432',
+        'ENGINE': os.environ.get('DB_ENGINE', 'django.db.backends.postgresql_psycopg2'),
+        'NAME': os.environ.get('DB_NAME', 'postgres'),
+        'USER': os.environ.get('DB_USER', 'postgres'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', 'password'),
+        'HOST': os.environ.get('DB_HOST', 'db'), # Service name in docker-compose.yml
+        'PORT': os.environ.get('DB_PORT', '5432'),
     }
 }
 
+# Read replicas: DB_REPLICAS is a comma-separated list of replica hosts
+# (host or host:port) sharing the primary's credentials. Reads made while
+# serving a request go to a replica; see credit_app.routers. With SQLite each
+# entry names a database file, which is only useful under the test runner
+# and the benchmark command: there the alias mirrors the test database,
+# while outside them it is an empty file that nothing replicates into.
+DATABASE_REPLICATION = {
+    'REPLICAS': [],
+    'MAX_LAG': float(os.environ.get('DB_REPLICA_MAX_LAG', 5)),
+    'CHECK_INTERVAL': float(os.environ.get('DB_REPLICA_CHECK_INTERVAL', 5)),
+    'PIN_SECONDS': int(os.environ.get('DB_REPLICA_PIN_SECONDS', 10)),
+}
+for index, replica in enumerate(filter(None, os.environ.get('DB_REPLICAS', '').split(',')), start=1):
+    alias = f'replica{index}'
+    DATABASES[alias] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+    if DATABASES[alias]['ENGINE'].endswith('sqlite3'):
+        DATABASES[alias]['NAME'] = replica
+    else:
+        host, _, port = replica.partition(':')
+        DATABASES[alias]['HOST'] = host
+        DATABASES[alias]['PORT'] = port or DATABASES['default']['PORT']
+    DATABASE_REPLICATION['REPLICAS'].append(alias)
+
+DATABASE_ROUTERS = ['credit_app.routers.ReplicaRouter']
+
 # Celery Configuration (if using Celery for background tasks)
 CELERY_BROKER_URL = 'redis://redis:6379/0' # Service name in docker-compose.yml
 CELERY_RESULT_BACKEND = 'redis://redis:6379/0'
@@ -93,6 +126,76 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 
+# Separate queues so short online tasks never wait behind hour-long imports.
+# Each queue gets its own worker in docker-compose.yml, with concurrency and
+# prefetch sized for its workload.
+CELERY_TASK_QUEUES = (
+    Queue('scoring', routing_key='scoring'),
+    Queue('ingestion', routing_key='ingestion'),
+    Queue('maintenance', routing_key='maintenance'),
+)
+CELERY_TASK_DEFAULT_QUEUE = 'scoring'
+CELERY_TASK_ROUTES = {
+    'credit_app.tasks.ingest_*': {'queue': 'ingestion'},
+    'credit_app.tasks.roll_forward_loan_statuses_task': {'queue': 'maintenance'},
+    'credit_app.tasks.build_loan_book_task': {'queue': 'maintenance'},
+    'credit_approval_system.celery.debug_task': {'queue': 'maintenance'},
+}
+CELERY_BEAT_SCHEDULE = {
+    'roll-forward-loan-statuses': {
+        'task': 'credit_app.tasks.roll_forward_loan_statuses_task',
+        'schedule': timedelta(hours=24),
+    },
+    'build-loan-book': {
+        'task': 'credit_app.tasks.build_loan_book_task',
+        'schedule': timedelta(hours=24),
+    },
+}
+# Per-worker rate limits; full reloads are rare and each one is heavy.
+CELERY_TASK_ANNOTATIONS = {
+    'credit_app.tasks.ingest_customer_data_task': {'rate_limit': '6/h'},
+    'credit_app.tasks.ingest_loan_data_task': {'rate_limit': '6/h'},
+}
+# Redis emulates priorities with one list per step (0 is served first).
+CELERY_TASK_DEFAULT_PRIORITY = 5
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'priority_steps': list(range(10)),
+    'sep': ':',
+    'queue_order_strategy': 'priority',
+    # Must exceed the longest task, or Redis redelivers acks_late tasks
+    # that are still running.
+    'visibility_timeout': 6 * 60 * 60,
+}
+# Reserve one task at a time by default; the scoring worker raises this on
+# its command line because its tasks are short.
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_TASK_REJECT_ON_WORKER_LOST = True
+CELERY_TASK_TRACK_STARTED = True
+CELERY_RESULT_EXPIRES = timedelta(hours=24)
+
+# Per-request/per-task SQL inspection (credit_app.querycount). Budgets are
+# keyed by URL name or Celery task name and are enforced by the test suite;
+# they include the explicit BEGIN that SQLite issues for atomic blocks.
+QUERY_INSPECTION = {
+    'ENABLED': DEBUG,
+    'SERVER_TIMING': DEBUG,
+    'DUPLICATE_THRESHOLD': 2,
+    'BUDGETS': {
+        'register_customer': 2,
+        'check_eligibility': 4,
+        'create_loan': 11,
+        'view_loan_detail': 2,
+        'view_customer_loans': 2,
+        'search_customers': 2,
+        'credit_score_history': 2,
+    },
+}
+
+# Columnar snapshot of the loan book for batch scoring (credit_app.loanbook),
+# rebuilt daily by build_loan_book_task. Every process that scores from it
+# maps the same file, so it must be on storage they all share.
+LOAN_BOOK_PATH = os.environ.get('LOAN_BOOK_PATH', str(BASE_DIR / 'loan_book.bin'))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 